@@ -0,0 +1,106 @@
+# api_client.py
+
+import threading
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+
+BACKEND_URL = "http://localhost:8000"
+REQUEST_TIMEOUT = (3.05, 30)  # (connect, read) seconds
+POOL_SIZE = 10
+ETAG_CACHE_ENTRIES = 64
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+EXPENSE_COLUMNS = ["_id", "product_name", "amount", "category", "date"]
+
+# --- Pooled Backend Client ---
+class ExpenseClient:
+    def __init__(self, base_url=BACKEND_URL, timeout=REQUEST_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        # One keep-alive connection pool shared by every call
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._etags = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _url(self, path):
+        return f"{self.base_url}{path}"
+
+    def _get(self, path, params=None):
+        # Conditional GET: replay the last ETag and reuse the stored payload on 304
+        key = (path, tuple(sorted((params or {}).items())))
+        with self._lock:
+            cached = self._etags.get(key)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        response = self.session.get(self._url(path), params=params, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and cached:
+            return cached[1]
+        response.raise_for_status()
+        payload = response.json()
+        if "ETag" in response.headers:
+            with self._lock:
+                self._etags[key] = (response.headers["ETag"], payload)
+                self._etags.move_to_end(key)
+                while len(self._etags) > ETAG_CACHE_ENTRIES:
+                    self._etags.popitem(last=False)
+        return payload
+
+    # --- Reads ---
+    def is_alive(self):
+        try:
+            response = self.session.get(self._url("/api/health/"), timeout=self.timeout)
+            return response.status_code == 200
+        except requests.RequestException:
+            return False
+
+    def expenses_page(self, cursor=None, **filters):
+        params = dict(filters, cursor=cursor) if cursor else filters
+        return self._get("/api/expenses/", params)
+
+    def dashboard(self, month=None):
+        return self._get("/api/dashboard/", {"month": month} if month else None)
+
+    def all_expenses(self, cursor=None, **filters):
+        expenses = []
+        while True:
+            page = self.expenses_page(cursor, page_size=1000, **filters)
+            expenses.extend(page["results"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                return expenses
+
+    def expenses_frame(self, cursor=None, **filters):
+        # Every page of the listing decoded straight into a DataFrame, as Arrow when pyarrow is installed
+        import pandas as pd
+        try:
+            import pyarrow as pa
+        except ImportError:
+            return pd.DataFrame.from_records(self.all_expenses(cursor, **filters), columns=EXPENSE_COLUMNS)
+        tables = []
+        while True:
+            params = dict(filters, page_size=1000, cursor=cursor) if cursor else dict(filters, page_size=1000)
+            response = self.session.get(self._url("/api/expenses/"), params=params, headers={"Accept": ARROW_MEDIA_TYPE}, timeout=self.timeout)
+            response.raise_for_status()
+            table = pa.ipc.open_stream(response.content).read_all()
+            cursor = (table.schema.metadata or {}).get(b"next_cursor", b"").decode()
+            tables.append(table.replace_schema_metadata(None))
+            if not cursor:
+                return pa.concat_tables(tables).to_pandas()
+
+    # --- Writes ---
+    def add_expense(self, data):
+        return self.session.post(self._url("/api/expenses/add/"), json=data, timeout=self.timeout)
+
+    def update_expense(self, expense_id, data):
+        return self.session.put(self._url(f"/api/expenses/{expense_id}/update/"), json=data, timeout=self.timeout)
+
+    def delete_expenses(self, expense_ids):
+        return self.session.post(self._url("/api/expenses/batch/delete/"), json={"ids": list(expense_ids)}, timeout=self.timeout)
+
+    def update_expenses(self, updates):
+        return self.session.post(self._url("/api/expenses/batch/update/"), json={"updates": list(updates)}, timeout=self.timeout)
+
+    def reset_expenses(self):
+        return self.session.delete(self._url("/api/expenses/reset/"), timeout=self.timeout)
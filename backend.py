@@ -1,91 +1,394 @@
 # Final enhanced backend.py with Update, Delete, Add, Reset, Get Total, Get All Expenses
 
-import os
 import sys
+import time
+import atexit
+import logging
+import io
+import csv
+import json
+import zlib
+import base64
+import asyncio
+from itertools import islice
 from datetime import datetime
+from functools import wraps
 from django.conf import settings
-from django.utils.crypto import get_random_string
-
-def configure_django():
-    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "expense_tracker.settings")
-
-    if not settings.configured:
-        settings.configure(
-            DEBUG=True,
-            SECRET_KEY=get_random_string(50),
-            ROOT_URLCONF=__name__,
-            ALLOWED_HOSTS=['*'],
-            MIDDLEWARE=[
-                'corsheaders.middleware.CorsMiddleware',
-                'django.middleware.common.CommonMiddleware',
-                'django.middleware.security.SecurityMiddleware',
-                'django.middleware.csrf.CsrfViewMiddleware',
-                'django.middleware.clickjacking.XFrameOptionsMiddleware',
-            ],
-            INSTALLED_APPS=[
-                'django.contrib.contenttypes',
-                'django.contrib.auth',
-                'rest_framework',
-                'corsheaders',
-            ],
-            DATABASES={
-                'default': {
-                    'ENGINE': 'django.db.backends.sqlite3',
-                    'NAME': 'expense_tracker.sqlite3',
-                }
-            },
-            REST_FRAMEWORK={
-                'DEFAULT_PERMISSION_CLASSES': [],
-                'UNAUTHENTICATED_USER': None,
-            },
-            TEMPLATES=[{
-                'BACKEND': 'django.template.backends.django.DjangoTemplates',
-                'APP_DIRS': True,
-            }],
-            CORS_ALLOW_ALL_ORIGINS=True,
-        )
-
-    import django
-    django.setup()
+from settings_config import configure_django, PRODUCTION
+
+logger = logging.getLogger(__name__)
+# Cold-start clock: module import through URL setup, reported once the app is built
+_import_started = time.perf_counter()
 
 # --- Configure Django ---
 configure_django()
 
 # --- Django Imports ---
+from asgiref.sync import sync_to_async
+from django.core.asgi import get_asgi_application
 from django.core.wsgi import get_wsgi_application
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
 from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from django.utils import timezone
 from rest_framework import serializers, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, renderer_classes
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from db import collection
+from db import collection, totals, meta_collection, get_async_database, using_mongo, storage_engine, close_storage, MONGO_COLLECTION, MONGO_TOTALS_COLLECTION
+from cache import cached_view, invalidates_cache, response_cache, MongoDataVersion
+from renderers import listing_renderers, ArrowRenderer, ARROW_MEDIA_TYPE, pa
+from metrics import registry, PROMETHEUS_CONTENT_TYPE
+from write_behind import InsertBatcher, BufferFull, WRITE_BEHIND
+
+# Production workers read through pymongo's async client; writes and the in-memory fallback stay synchronous
+ASYNC_READS = PRODUCTION and using_mongo()
+# Opt-in group commit: concurrent adds wait on one shared insert_many instead of one insert_one each
+insert_batcher = InsertBatcher(collection) if WRITE_BEHIND else None
+
+def _shutdown():
+    # One exit hook, so buffered expenses are written before the storage they go to is closed
+    if insert_batcher is not None:
+        insert_batcher.close()
+    close_storage()
+
+atexit.register(_shutdown)
 
 # --- Serializer ---
 class ExpenseSerializer(serializers.Serializer):
     product_name = serializers.CharField(max_length=100)
     amount = serializers.FloatField(min_value=0.01)
-    date = serializers.DateTimeField(default=datetime.now)
+    date = serializers.DateTimeField(default=timezone.now)
     category = serializers.CharField(max_length=100, default="Others")
 
     def create(self, validated_data):
-        result = collection.insert_one(validated_data)
-        validated_data['_id'] = str(result.inserted_id)
+        if insert_batcher is not None:
+            inserted_id = insert_batcher.insert(validated_data)
+        else:
+            inserted_id = collection.insert_one(validated_data).inserted_id
+        totals.add(validated_data)
+        validated_data['_id'] = str(inserted_id)
         return validated_data
 
+# --- Query Helpers ---
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPENSE_PROJECTION = {'_id': 1, 'product_name': 1, 'amount': 1, 'category': 1, 'date': 1}
+EXPENSE_SORT = [('date', 1), ('_id', 1)]
+
+_date_param = serializers.DateTimeField(input_formats=['iso-8601', '%Y-%m-%d'])
+
+def _parse_id(value):
+    from bson import ObjectId
+    from bson.errors import InvalidId
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        # InMemoryDB and SQLiteDB ids are plain strings
+        return value
+
+def _month_bounds(month):
+    try:
+        start = datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        raise serializers.ValidationError({"month": "Expected format YYYY-MM."})
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    if settings.USE_TZ:
+        start, end = timezone.make_aware(start), timezone.make_aware(end)
+    return start, end
+
+def _float_param(params, name):
+    try:
+        return float(params[name])
+    except ValueError:
+        raise serializers.ValidationError({name: "A valid number is required."})
+
+def _expense_filter(params):
+    query = {}
+    date_range = {}
+    if params.get('month'):
+        date_range['$gte'], date_range['$lt'] = _month_bounds(params['month'])
+    if params.get('start'):
+        start = _date_param.to_internal_value(params['start'])
+        date_range['$gte'] = max(start, date_range.get('$gte', start))
+    if params.get('end'):
+        end = _date_param.to_internal_value(params['end'])
+        date_range['$lt'] = min(end, date_range.get('$lt', end))
+    if date_range:
+        query['date'] = date_range
+
+    categories = params.getlist('category')
+    if len(categories) == 1:
+        query['category'] = categories[0]
+    elif categories:
+        query['category'] = {'$in': categories}
+
+    amount_range = {}
+    if params.get('min_amount'):
+        amount_range['$gte'] = _float_param(params, 'min_amount')
+    if params.get('max_amount'):
+        amount_range['$lte'] = _float_param(params, 'max_amount')
+    if amount_range:
+        query['amount'] = amount_range
+    return query
+
+def _date_group(fmt):
+    return {'$dateToString': {'format': fmt, 'date': '$date', 'timezone': settings.TIME_ZONE}}
+
+SUMMARY_GROUPS = {
+    'month': _date_group('%Y-%m'),
+    'day': _date_group('%Y-%m-%d'),
+    'category': '$category',
+    'product': '$product_name',
+}
+
+def _group_stages(group):
+    return [
+        {'$group': {'_id': SUMMARY_GROUPS[group], 'total': {'$sum': '$amount'}, 'count': {'$sum': 1}}},
+        {'$sort': {'_id': 1}},
+    ]
+
+def _summary_pipeline(query, group):
+    return ([{'$match': query}] if query else []) + _group_stages(group)
+
+def _dashboard_pipeline(month, page_size):
+    # One round trip for everything the selected month needs
+    start, end = _month_bounds(month)
+    return [
+        {'$match': {'date': {'$gte': start, '$lt': end}}},
+        {'$facet': {
+            'expenses': [{'$sort': dict(EXPENSE_SORT)}, {'$limit': page_size + 1}, {'$project': EXPENSE_PROJECTION}],
+            'categories': _group_stages('category'),
+            'products': _group_stages('product'),
+        }},
+    ]
+
+def _rollup(rows):
+    return [{"key": row['_id'], "total": row['total'], "count": row['count']} for row in rows]
+
+def _summary_group(params):
+    group = params.get('group', 'month')
+    if group not in SUMMARY_GROUPS:
+        raise serializers.ValidationError({"group": f"Expected one of: {', '.join(SUMMARY_GROUPS)}."})
+    return group
+
+def _empty_dashboard(month, months, total):
+    return {"total": total, "months": months, "month": month, "time_zone": settings.TIME_ZONE,
+            "expenses": {"results": [], "next_cursor": None}, "categories": [], "products": []}
+
+def _fill_dashboard(dashboard, facets, page_size):
+    dashboard["expenses"] = _page(facets['expenses'], page_size)
+    dashboard["categories"] = _rollup(facets['categories'])
+    dashboard["products"] = _rollup(facets['products'])
+    return dashboard
+
+def _page_size(params):
+    try:
+        size = int(params.get('page_size', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise serializers.ValidationError({"page_size": "A valid integer is required."})
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+def _encode_cursor(expense):
+    raw = json.dumps([expense['date'].isoformat(), str(expense['_id'])])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _page(expenses, page_size):
+    # `expenses` holds up to page_size + 1 rows; the extra row only signals that another page exists
+    next_cursor = _encode_cursor(expenses[page_size - 1]) if len(expenses) > page_size else None
+    expenses = expenses[:page_size]
+    for expense in expenses:
+        expense['_id'] = str(expense['_id'])
+    return {"results": expenses, "next_cursor": next_cursor}
+
+def _decode_cursor(cursor):
+    try:
+        date, _id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(date), _parse_id(_id)
+    except (ValueError, TypeError):
+        raise serializers.ValidationError({"cursor": "Invalid cursor."})
+
+def _list_query(params):
+    query = _expense_filter(params)
+    if params.get('cursor'):
+        query = _after_cursor(query, params['cursor'])
+    return query, _page_size(params)
+
+def _after_cursor(query, cursor):
+    return _after(query, *_decode_cursor(cursor))
+
+def _after(query, date, _id):
+    # Keyset pagination on (date, _id): resume strictly after the last row of the previous page
+    keyset = {'$or': [{'date': {'$gt': date}}, {'date': date, '_id': {'$gt': _id}}]}
+    return {'$and': [query, keyset]} if query else keyset
+
+# --- Bulk Import Helpers ---
+BULK_BATCH_SIZE = 1000
+CSV_CONTENT_TYPES = ('text/csv', 'application/csv')
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+def _bulk_source(request):
+    # Returns (format, iterator of text lines) without reading the whole upload into memory
+    if request.content_type.startswith('multipart/form-data'):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise serializers.ValidationError({"file": "No file was submitted."})
+        name = upload.name.lower()
+        fmt = 'csv' if name.endswith('.csv') or upload.content_type in CSV_CONTENT_TYPES else 'ndjson'
+        return fmt, io.TextIOWrapper(upload, encoding='utf-8-sig', newline='')
+    if request.content_type in CSV_CONTENT_TYPES:
+        fmt = 'csv'
+    elif request.content_type in NDJSON_CONTENT_TYPES:
+        fmt = 'ndjson'
+    else:
+        raise serializers.ValidationError({"content_type": "Upload a CSV or NDJSON file."})
+    stream = request.stream
+    return fmt, (line.decode('utf-8-sig') for line in (stream if stream is not None else []))
+
+def _bulk_rows(fmt, lines):
+    # Yields (row_number, row, parse_error); row numbers are 1-based data rows
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(lines), start=1):
+            yield number, {key: value for key, value in row.items() if key and value not in ('', None)}, None
+        return
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, None, {"non_field_errors": [f"Invalid JSON: {e}"]}
+            continue
+        if isinstance(row, dict):
+            yield number, row, None
+        else:
+            yield number, None, {"non_field_errors": ["Expected a JSON object."]}
+
+def _insert_batch(documents, row_numbers, errors):
+    # Returns the documents that were actually written
+    from pymongo.errors import BulkWriteError
+    try:
+        collection.insert_many(documents, ordered=False)
+        return documents
+    except BulkWriteError as e:
+        failed = set()
+        for write_error in e.details.get('writeErrors', []):
+            failed.add(write_error['index'])
+            errors.append({"row": row_numbers[write_error['index']], "errors": {"non_field_errors": [write_error['errmsg']]}})
+        return [doc for index, doc in enumerate(documents) if index not in failed]
+
+# --- Streaming Export Helpers ---
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+EXPORT_FIELDS = ['_id', 'date', 'product_name', 'amount', 'category']
+
+def _export_batch(query, last=None):
+    # One keyset page at a time, so memory is bounded by the batch size rather than the export size
+    if last is not None:
+        query = _after(query, last['date'], last['_id'])
+    return list(collection.find(query, EXPENSE_PROJECTION, sort=EXPENSE_SORT, limit=EXPORT_BATCH_SIZE))
+
+class _ExportEncoder:
+    # Turns batches of expenses into (optionally gzipped) CSV or NDJSON bytes
+    def __init__(self, fmt, compress):
+        from rest_framework.utils.encoders import JSONEncoder
+        self.fmt = fmt
+        self.json = JSONEncoder()
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        self.compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def _bytes(self, text):
+        # May be empty while gzip buffers; servers skip empty chunks
+        data = text.encode('utf-8')
+        return self.compressor.compress(data) if self.compressor else data
+
+    def header(self):
+        return self._bytes(','.join(EXPORT_FIELDS) + '\r\n') if self.fmt == 'csv' else b''
+
+    def encode(self, batch):
+        # Stringifies ids on copies: the stream still needs the last fetched ObjectId for its next keyset query
+        if self.fmt == 'ndjson':
+            return self._bytes(''.join(json.dumps(dict(expense, _id=str(expense['_id'])), default=self.json.default) + '\n'
+                                       for expense in batch))
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for expense in batch:
+            writer.writerow([str(expense['_id'])] + [self.json.default(value) if isinstance(value, datetime) else value
+                                                     for value in (expense.get(field) for field in EXPORT_FIELDS[1:])])
+        return self._bytes(buffer.getvalue())
+
+    def finish(self):
+        return self.compressor.flush() if self.compressor else b''
+
+def _export_stream(query, encoder):
+    yield encoder.header()
+    batch = _export_batch(query)
+    while batch:
+        last = batch[-1]
+        yield encoder.encode(batch)
+        batch = _export_batch(query, last) if len(batch) == EXPORT_BATCH_SIZE else []
+    yield encoder.finish()
+
+async def _export_stream_async(query, encoder):
+    # ASGI drains synchronous iterators into a list before sending anything, so it gets an async one
+    fetch = sync_to_async(_export_batch)
+    yield encoder.header()
+    batch = await fetch(query)
+    while batch:
+        last = batch[-1]
+        yield encoder.encode(batch)
+        batch = await fetch(query, last) if len(batch) == EXPORT_BATCH_SIZE else []
+    yield encoder.finish()
+
 # --- API Views ---
 @api_view(['GET'])
 def health_check(request):
-    return Response({"status": "ok"}, status=200)
+    # Readiness: the first probe opens the database connection, so "ok" means requests can be served
+    return Response({"status": "ok", "storage": storage_engine()}, status=200)
 
+def get_metrics(request):
+    # Prometheus scrape target; a plain Django view so it is never cached or content-negotiated
+    return HttpResponse(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@require_GET
+def export_expenses(request):
+    # Plain Django view: DRF would claim ?format= for its own renderer selection
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_CONTENT_TYPES:
+        return _json_response({"format": f"Expected one of: {', '.join(EXPORT_CONTENT_TYPES)}."}, status.HTTP_400_BAD_REQUEST)
+    try:
+        query = _expense_filter(request.GET)
+    except serializers.ValidationError as e:
+        return _json_response(e.detail, status.HTTP_400_BAD_REQUEST)
+    compress = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    encoder = _ExportEncoder(fmt, compress)
+    stream = _export_stream_async if isinstance(request, ASGIRequest) else _export_stream
+    response = StreamingHttpResponse(stream(query, encoder), content_type=EXPORT_CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="expenses.{fmt}"'
+    response['Vary'] = 'Accept-Encoding'
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    return response
+
+@cached_view
 @api_view(['GET'])
+@renderer_classes(listing_renderers())
 def get_expenses(request):
     try:
-        expenses = list(collection.find({}, {'_id': 1, 'product_name': 1, 'amount': 1, 'category': 1, 'date': 1}))
-        for expense in expenses:
-            expense['_id'] = str(expense['_id'])
-        return Response(expenses)
+        query, page_size = _list_query(request.query_params)
+        # Fetch one extra row to learn whether another page exists
+        expenses = list(collection.find(query, EXPENSE_PROJECTION, sort=EXPENSE_SORT, limit=page_size + 1))
+        return Response(_page(expenses, page_size))
+    except serializers.ValidationError as e:
+        return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({"error": str(e)}, status=500)
 
+@invalidates_cache
 @api_view(['POST'])
 def add_expense(request):
     serializer = ExpenseSerializer(data=request.data)
@@ -93,65 +396,314 @@ def add_expense(request):
         try:
             expense = serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
+        except BufferFull as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "1"})
         except Exception as e:
             return Response({"error": str(e)}, status=500)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@invalidates_cache
+@api_view(['POST'])
+def bulk_add_expenses(request):
+    try:
+        fmt, lines = _bulk_source(request)
+        rows = _bulk_rows(fmt, lines)
+        inserted, total_rows, errors = 0, 0, []
+        while True:
+            batch = list(islice(rows, BULK_BATCH_SIZE))
+            if not batch:
+                break
+            total_rows += len(batch)
+            documents, row_numbers = [], []
+            for number, row, parse_error in batch:
+                serializer = ExpenseSerializer(data=row) if row is not None else None
+                if serializer is not None and serializer.is_valid():
+                    documents.append(serializer.validated_data)
+                    row_numbers.append(number)
+                else:
+                    errors.append({"row": number, "errors": parse_error or serializer.errors})
+            if documents:
+                written = _insert_batch(documents, row_numbers, errors)
+                totals.add(*written)
+                inserted += len(written)
+    except serializers.ValidationError as e:
+        return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({"error": str(e)}, status=500)
+    if not total_rows:
+        return Response({"error": "The upload contains no rows"}, status=status.HTTP_400_BAD_REQUEST)
+    response_status = status.HTTP_201_CREATED if inserted else status.HTTP_400_BAD_REQUEST
+    errors.sort(key=lambda error: error["row"])
+    return Response({"inserted": inserted, "rows": total_rows, "errors": errors}, status=response_status)
+
+@invalidates_cache
 @api_view(['PUT'])
 def update_expense(request, expense_id):
+    serializer = ExpenseSerializer(data=request.data, partial=True)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     try:
-        from bson import ObjectId
-        update_fields = request.data
-        result = collection.update_one({"_id": ObjectId(expense_id)}, {"$set": update_fields})
-        if result.modified_count == 1:
+        from pymongo import ReturnDocument
+        changes = serializer.validated_data
+        before = collection.find_one_and_update({"_id": _parse_id(expense_id)}, {"$set": changes}, return_document=ReturnDocument.BEFORE)
+        if before is not None and any(before.get(field) != value for field, value in changes.items()):
+            totals.remove(before)
+            totals.add({**before, **changes})
             return Response({"message": "Expense updated successfully"})
         else:
             return Response({"error": "Expense not found or no changes made"}, status=404)
     except Exception as e:
         return Response({"error": str(e)}, status=500)
 
+@cached_view
 @api_view(['GET'])
 def get_total_expenses(request):
     try:
-        pipeline = [{"$group": {"_id": None, "total": {"$sum": "$amount"}}}]
-        result = list(collection.aggregate(pipeline))
-        total = result[0]["total"] if result else 0
-        return Response({"total": total})
+        return Response({"total": totals.get()["total"]})
+    except Exception as e:
+        return Response({"error": str(e)}, status=500)
+
+@cached_view
+@api_view(['GET'])
+def get_expense_summary(request):
+    try:
+        group = _summary_group(request.query_params)
+        query = _expense_filter(request.query_params)
+        if not query and group in ('month', 'category'):
+            # Unfiltered month/category rollups are kept up to date by the write paths
+            results = [{"key": key, **row} for key, row in totals.by(group).items()]
+        else:
+            results = _rollup(collection.aggregate(_summary_pipeline(query, group)))
+        return Response({"group": group, "results": results})
+    except serializers.ValidationError as e:
+        return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({"error": str(e)}, status=500)
+
+@cached_view
+@api_view(['GET'])
+def get_dashboard(request):
+    try:
+        params = request.query_params
+        page_size = _page_size(params)
+        months = [{"key": key, **row} for key, row in totals.by('month').items()]
+        month = params.get('month') or (months[-1]["key"] if months else None)
+        dashboard = _empty_dashboard(month, months, totals.get()["total"])
+        if month:
+            facets = list(collection.aggregate(_dashboard_pipeline(month, page_size)))[0]
+            _fill_dashboard(dashboard, facets, page_size)
+        return Response(dashboard)
+    except serializers.ValidationError as e:
+        return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({"error": str(e)}, status=500)
+
+def _batch(request, field):
+    items = request.data.get(field) if isinstance(request.data, dict) else None
+    if not isinstance(items, list) or not items:
+        raise serializers.ValidationError({field: "Expected a non-empty list."})
+    if len(items) > MAX_PAGE_SIZE:
+        raise serializers.ValidationError({field: f"At most {MAX_PAGE_SIZE} items per request."})
+    return items
+
+@invalidates_cache
+@api_view(['POST'])
+def batch_delete_expenses(request):
+    try:
+        ids = [_parse_id(str(expense_id)) for expense_id in _batch(request, 'ids')]
+        # Read the documents first so the running totals can be adjusted
+        documents = list(collection.find({"_id": {"$in": ids}}))
+        if documents:
+            collection.delete_many({"_id": {"$in": [doc['_id'] for doc in documents]}})
+            totals.remove(*documents)
+        return Response({"deleted": len(documents)})
+    except serializers.ValidationError as e:
+        return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({"error": str(e)}, status=500)
 
+@invalidates_cache
+@api_view(['POST'])
+def batch_update_expenses(request):
+    from pymongo import ReturnDocument
+    try:
+        updates = _batch(request, 'updates')
+        updated, errors = 0, []
+        for update in updates:
+            fields = dict(update) if isinstance(update, dict) else {}
+            expense_id = str(fields.pop('_id', ''))
+            serializer = ExpenseSerializer(data=fields, partial=True)
+            if not expense_id or not serializer.is_valid():
+                errors.append({"_id": expense_id, "errors": serializer.errors if expense_id else {"_id": ["This field is required."]}})
+                continue
+            changes = serializer.validated_data
+            before = collection.find_one_and_update({"_id": _parse_id(expense_id)}, {"$set": changes}, return_document=ReturnDocument.BEFORE)
+            if before is None:
+                errors.append({"_id": expense_id, "errors": {"_id": ["Expense not found."]}})
+                continue
+            totals.remove(before)
+            totals.add({**before, **changes})
+            updated += 1
+        return Response({"updated": updated, "errors": errors})
+    except serializers.ValidationError as e:
+        return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({"error": str(e)}, status=500)
+
+@invalidates_cache
 @api_view(['DELETE'])
 def reset_expenses(request):
     try:
         collection.delete_many({})
+        totals.reset()
         return Response({"message": "All expenses deleted successfully"})
     except Exception as e:
         return Response({"error": str(e)}, status=500)
 
+@invalidates_cache
 @api_view(['DELETE'])
 def delete_expense(request, expense_id):
     try:
-        from bson import ObjectId
-        result = collection.delete_one({"_id": ObjectId(expense_id)})
-        if result.deleted_count == 1:
+        deleted = collection.find_one_and_delete({"_id": _parse_id(expense_id)})
+        if deleted is not None:
+            totals.remove(deleted)
             return Response({"message": "Expense deleted successfully"})
         else:
             return Response({"error": "Expense not found"}, status=404)
     except Exception as e:
         return Response({"error": str(e)}, status=500)
 
+# --- Async Read Views (ASGI production mode) ---
+def _json_response(data, status_code=200):
+    return HttpResponse(JSONRenderer().render(data), content_type=JSONRenderer.media_type, status=status_code)
+
+def _async_read(handler):
+    # Gives an async handler(request, async_db) the same method check and error mapping as the DRF views
+    @wraps(handler)
+    async def view(request):
+        if request.method not in ('GET', 'HEAD'):
+            return _json_response({"detail": f'Method "{request.method}" not allowed.'}, status.HTTP_405_METHOD_NOT_ALLOWED)
+        try:
+            data = await handler(request, get_async_database())
+        except serializers.ValidationError as e:
+            return _json_response(e.detail, status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return _json_response({"error": str(e)}, 500)
+        return data if isinstance(data, HttpResponse) else _json_response(data)
+    return view
+
+def _wants_arrow(request):
+    return pa is not None and (request.GET.get('format') == 'arrow' or ARROW_MEDIA_TYPE in request.META.get('HTTP_ACCEPT', ''))
+
+@cached_view
+@_async_read
+async def get_expenses_async(request, adb):
+    query, page_size = _list_query(request.GET)
+    expenses = await adb[MONGO_COLLECTION].find(query, EXPENSE_PROJECTION, sort=EXPENSE_SORT, limit=page_size + 1).to_list()
+    page = _page(expenses, page_size)
+    if _wants_arrow(request):
+        return HttpResponse(ArrowRenderer().render(page), content_type=ARROW_MEDIA_TYPE)
+    return page
+
+@cached_view
+@_async_read
+async def get_total_expenses_async(request, adb):
+    return {"total": (await totals.aget(adb[MONGO_TOTALS_COLLECTION]))["total"]}
+
+@cached_view
+@_async_read
+async def get_expense_summary_async(request, adb):
+    group = _summary_group(request.GET)
+    query = _expense_filter(request.GET)
+    if not query and group in ('month', 'category'):
+        rows = await totals.aby(group, adb[MONGO_TOTALS_COLLECTION])
+        return {"group": group, "results": [{"key": key, **row} for key, row in rows.items()]}
+    cursor = await adb[MONGO_COLLECTION].aggregate(_summary_pipeline(query, group))
+    return {"group": group, "results": _rollup(await cursor.to_list())}
+
+@cached_view
+@_async_read
+async def get_dashboard_async(request, adb):
+    page_size = _page_size(request.GET)
+    months = [{"key": key, **row} for key, row in (await totals.aby('month', adb[MONGO_TOTALS_COLLECTION])).items()]
+    month = request.GET.get('month') or (months[-1]["key"] if months else None)
+    dashboard = _empty_dashboard(month, months, (await totals.aget(adb[MONGO_TOTALS_COLLECTION]))["total"])
+    if month:
+        cursor = await adb[MONGO_COLLECTION].aggregate(_dashboard_pipeline(month, page_size))
+        _fill_dashboard(dashboard, (await cursor.to_list())[0], page_size)
+    return dashboard
+
+ASYNC_READ_VIEWS = {
+    get_expenses: get_expenses_async,
+    get_total_expenses: get_total_expenses_async,
+    get_expense_summary: get_expense_summary_async,
+    get_dashboard: get_dashboard_async,
+}
+
+@csrf_exempt
+async def add_expense_async(request):
+    # Django runs sync views on one thread per ASGI worker, so only an async view lets adds share a batch
+    if request.method != 'POST':
+        return _json_response({"detail": f'Method "{request.method}" not allowed.'}, status.HTTP_405_METHOD_NOT_ALLOWED)
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError as e:
+        return _json_response({"detail": f"JSON parse error - {e}"}, status.HTTP_400_BAD_REQUEST)
+    serializer = ExpenseSerializer(data=data)
+    if not serializer.is_valid():
+        return _json_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+    expense = dict(serializer.validated_data)
+    try:
+        # No blocking wait on a full buffer inside the event loop; the client retries instead
+        inserted_id = await asyncio.wrap_future(insert_batcher.submit(expense, timeout=0))
+    except BufferFull as e:
+        response = _json_response({"error": str(e)}, status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = "1"
+        return response
+    except Exception as e:
+        return _json_response({"error": str(e)}, 500)
+    expense['_id'] = str(inserted_id)
+    await sync_to_async(_after_insert, thread_sensitive=False)(expense)
+    return _json_response(ExpenseSerializer(expense).data, status.HTTP_201_CREATED)
+
+def _after_insert(expense):
+    totals.add(expense)
+    response_cache.bump()
+
+def _add_view():
+    return add_expense_async if ASYNC_READS and insert_batcher is not None else add_expense
+
+def _read_view(view):
+    return ASYNC_READ_VIEWS[view] if ASYNC_READS else view
+
+if ASYNC_READS:
+    # Seed the running totals before serving, and share the data version between workers
+    totals.ensure_seeded()
+    response_cache.version_store = MongoDataVersion(meta_collection, lambda: get_async_database()[meta_collection.name])
+
 # --- URL Patterns ---
 urlpatterns = [
     path('api/health/', health_check, name='health_check'),
-    path('api/expenses/', get_expenses, name='get_expenses'),
-    path('api/expenses/add/', add_expense, name='add_expense'),
+    path('api/metrics/', get_metrics, name='get_metrics'),
+    path('api/dashboard/', _read_view(get_dashboard), name='get_dashboard'),
+    path('api/expenses/', _read_view(get_expenses), name='get_expenses'),
+    path('api/expenses/add/', _add_view(), name='add_expense'),
+    path('api/expenses/bulk/', bulk_add_expenses, name='bulk_add_expenses'),
+    path('api/expenses/export/', export_expenses, name='export_expenses'),
+    path('api/expenses/batch/delete/', batch_delete_expenses, name='batch_delete_expenses'),
+    path('api/expenses/batch/update/', batch_update_expenses, name='batch_update_expenses'),
     path('api/expenses/<str:expense_id>/update/', update_expense, name='update_expense'),
-    path('api/expenses/total/', get_total_expenses, name='get_total_expenses'),
+    path('api/expenses/total/', _read_view(get_total_expenses), name='get_total_expenses'),
+    path('api/expenses/summary/', _read_view(get_expense_summary), name='get_expense_summary'),
     path('api/expenses/reset/', reset_expenses, name='reset_expenses'),
     path('api/expenses/<str:expense_id>/delete/', delete_expense, name='delete_expense'),
 ]
 
 application = get_wsgi_application()
+asgi_application = get_asgi_application()
+
+STARTUP_MS = (time.perf_counter() - _import_started) * 1000
+logger.info(f"Backend loaded in {STARTUP_MS:.0f} ms")
 
 # --- Run Server ---
 def run_django_server():
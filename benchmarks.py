@@ -0,0 +1,362 @@
+# benchmarks.py
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+SEED_BATCH_SIZE = 5000
+CATEGORIES = ["Food", "Travel", "Bills", "Shopping", "Others"]
+PRODUCTS = [f"product-{n}" for n in range(200)]
+# Synthetic expenses are spread over the 12 months before this fixed date, so runs are comparable
+ANCHOR = datetime(2025, 1, 1, tzinfo=timezone.utc)
+MONTHS = [(ANCHOR - timedelta(days=30 * n + 15)).strftime("%Y-%m") for n in range(12)]
+
+# --- Synthetic Data ---
+def synthetic_expenses(count, seed=0):
+    rnd = random.Random(seed)
+    for _ in range(count):
+        yield {
+            "product_name": rnd.choice(PRODUCTS),
+            "amount": round(rnd.uniform(1, 500), 2),
+            "category": rnd.choice(CATEGORIES),
+            "date": ANCHOR - timedelta(seconds=rnd.randrange(365 * 24 * 3600)),
+        }
+
+def _ndjson(expenses):
+    return "".join(json.dumps(dict(expense, date=expense["date"].isoformat())) + "\n" for expense in expenses)
+
+# --- Measurements ---
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def latency_stats(latencies):
+    # Seconds in, milliseconds out
+    values = sorted(latency * 1000 for latency in latencies)
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values) if values else None,
+        "p50_ms": percentile(values, 0.50),
+        "p95_ms": percentile(values, 0.95),
+        "p99_ms": percentile(values, 0.99),
+        "max_ms": values[-1] if values else None,
+    }
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _environment(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "arguments": {key: value for key, value in vars(args).items() if key != "func"},
+    }
+
+# --- API Load Test ---
+class _TestClientTransport:
+    # Drives the views in this process through Django's test client; one client per thread
+    def __init__(self):
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, content_type="application/json"):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            from django.test import Client
+            client = self._local.client = Client()
+        if method == "GET":
+            response = client.get(path)
+        else:
+            response = getattr(client, method.lower())(path, data=body or "", content_type=content_type)
+        return response.status_code, response.content
+
+class _HttpTransport:
+    # Drives a running server (runserver or serve.py) over keep-alive HTTP
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, content_type="application/json"):
+        import requests
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        response = session.request(method, self.base_url + path, data=body, headers={"Content-Type": content_type})
+        return response.status_code, response.content
+
+def _seed(transport, count, seed):
+    expenses = synthetic_expenses(count, seed)
+    inserted = 0
+    while inserted < count:
+        batch = [expense for _, expense in zip(range(SEED_BATCH_SIZE), expenses)]
+        status, content = transport.request("POST", "/api/expenses/bulk/", _ndjson(batch), "application/x-ndjson")
+        if status != 201:
+            raise RuntimeError(f"Seeding failed with HTTP {status}: {content[:200]!r}")
+        inserted += len(batch)
+    return inserted
+
+def _expense_ids(transport, count):
+    ids, cursor = [], None
+    while len(ids) < count:
+        path = "/api/expenses/?page_size=1000" + (f"&cursor={cursor}" if cursor else "")
+        status, content = transport.request("GET", path)
+        page = json.loads(content)
+        ids.extend(expense["_id"] for expense in page["results"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    return ids
+
+def _scenarios(rnd, ids):
+    # endpoint -> function(i) returning (method, path, body) for the i-th request
+    new_expenses = list(synthetic_expenses(len(ids) or 1, rnd.random()))
+    delete_ids = list(ids)
+    rnd.shuffle(delete_ids)
+
+    def add(i):
+        return "POST", "/api/expenses/add/", _ndjson([new_expenses[i % len(new_expenses)]]).strip()
+
+    def list_page(i):
+        category = rnd.choice(CATEGORIES + [None])
+        return "GET", f"/api/expenses/?month={rnd.choice(MONTHS)}" + (f"&category={category}" if category else ""), None
+
+    def total(i):
+        return "GET", "/api/expenses/total/", None
+
+    def update(i):
+        return "PUT", f"/api/expenses/{rnd.choice(ids)}/update/", json.dumps({"amount": round(rnd.uniform(1, 500), 2)})
+
+    def delete(i):
+        return "DELETE", f"/api/expenses/{delete_ids[i]}/delete/", None
+
+    return {"add_expense": add, "get_expenses": list_page, "get_total_expenses": total, "update_expense": update, "delete_expense": delete}
+
+def _drive(transport, make_request, requests_count, concurrency):
+    def one(i):
+        method, path, body = make_request(i)
+        started = time.perf_counter()
+        status, _ = transport.request(method, path, body)
+        return time.perf_counter() - started, status < 400
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(one, range(requests_count)))
+    elapsed = time.perf_counter() - started
+    return dict(
+        latency_stats([latency for latency, _ in outcomes]),
+        errors=sum(not ok for _, ok in outcomes),
+        throughput_rps=requests_count / elapsed if elapsed else None,
+    )
+
+def run_api(args):
+    if args.url:
+        transport = _HttpTransport(args.url)
+        if args.reset:
+            transport.request("DELETE", "/api/expenses/reset/")
+    else:
+        # In-process runs never touch a real database: in-memory or a throwaway SQLite file
+        os.environ["EXPENSE_TRACKER_STORAGE"] = args.storage
+        if args.storage == "sqlite":
+            os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "benchmark.sqlite3")
+        from settings_config import configure_django
+        configure_django()
+        import backend  # noqa: F401 (registers the URLs)
+        transport = _TestClientTransport()
+
+    started = time.perf_counter()
+    seeded = _seed(transport, args.expenses, args.seed)
+    seed_seconds = time.perf_counter() - started
+    logger.info(f"Seeded {seeded} expenses in {seed_seconds:.1f}s")
+
+    rnd = random.Random(args.seed)
+    ids = _expense_ids(transport, args.requests)
+    if len(ids) < args.requests:
+        raise RuntimeError(f"Only {len(ids)} expenses to update/delete; seed at least --requests expenses")
+    results = []
+    for endpoint, make_request in _scenarios(rnd, ids).items():
+        stats = _drive(transport, make_request, args.requests, args.concurrency)
+        logger.info(f"{endpoint}: p50 {stats['p50_ms']:.2f} ms, p95 {stats['p95_ms']:.2f} ms, {stats['throughput_rps']:.0f} req/s")
+        results.append(dict(endpoint=endpoint, expenses=args.expenses, concurrency=args.concurrency, **stats))
+    return {"seed_seconds": seed_seconds, "results": results, "peak_rss_mb": peak_rss_mb()}
+
+# --- Storage Micro-Benchmarks ---
+def _open_engine(engine):
+    import db
+    if engine == "memory":
+        return db.InMemoryDB()
+    if engine == "columnar":
+        from columnar_db import ColumnarDB
+        return ColumnarDB()
+    if engine == "sqlite":
+        from sqlite_db import SQLiteDB
+        return SQLiteDB(os.path.join(tempfile.mkdtemp(), "benchmark.sqlite3"))
+    if engine == "mongo":
+        from pymongo import MongoClient
+        client = MongoClient(db.MONGO_URI, serverSelectionTimeoutMS=db.MONGO_TIMEOUT_MS)
+        database = client[f"{db.MONGO_DB}_benchmark"]
+        database.drop_collection(db.MONGO_COLLECTION)
+        db.ensure_indexes(database)
+        return database[db.MONGO_COLLECTION]
+    raise ValueError(f"Unknown engine: {engine}")
+
+def _time(operation, repeat):
+    latencies = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - started)
+    return latency_stats(latencies)
+
+def bench_storage(engine, size, repeat, seed):
+    from django.http import QueryDict
+    import backend
+    collection = _open_engine(engine)
+    rnd = random.Random(seed)
+    documents = list(synthetic_expenses(size, seed))
+
+    started = time.perf_counter()
+    ids = []
+    for offset in range(0, size, backend.BULK_BATCH_SIZE):
+        ids.extend(collection.insert_many(documents[offset:offset + backend.BULK_BATCH_SIZE], ordered=False).inserted_ids)
+    insert_seconds = time.perf_counter() - started
+
+    def filtered(params):
+        return backend._expense_filter(QueryDict(params))
+
+    def page(query):
+        return lambda i: collection.find(query, backend.EXPENSE_PROJECTION, sort=backend.EXPENSE_SORT, limit=backend.DEFAULT_PAGE_SIZE + 1)
+
+    def pipeline(pipeline):
+        return lambda i: list(collection.aggregate(pipeline))
+
+    month = MONTHS[len(MONTHS) // 2]
+    delete_ids = rnd.sample(ids, min(repeat, len(ids)))
+    operations = {
+        "find_page": page({}),
+        "find_month_page": page(filtered(f"month={month}")),
+        "find_category_month_page": page(filtered(f"month={month}&category=Food")),
+        "find_one_by_id": lambda i: collection.find_one({"_id": rnd.choice(ids)}),
+        "summary_month": pipeline(backend._summary_pipeline({}, "month")),
+        "summary_product_in_month": pipeline(backend._summary_pipeline(filtered(f"month={month}"), "product")),
+        "dashboard": pipeline(backend._dashboard_pipeline(month, backend.DEFAULT_PAGE_SIZE)),
+        "update_one": lambda i: collection.update_one({"_id": rnd.choice(ids)}, {"$set": {"amount": 1.0}}),
+        "delete_one": lambda i: collection.delete_one({"_id": delete_ids[i]}),
+    }
+    results = [{"engine": engine, "size": size, "operation": "insert_many", "seconds": insert_seconds, "rows_per_second": size / insert_seconds if insert_seconds else None}]
+    for name, operation in operations.items():
+        stats = _time(operation, len(delete_ids) if name == "delete_one" else repeat)
+        logger.info(f"{engine} x {size} {name}: p50 {stats['p50_ms']:.3f} ms, p95 {stats['p95_ms']:.3f} ms")
+        results.append(dict(engine=engine, size=size, operation=name, **stats))
+    return results
+
+def run_storage(args):
+    from settings_config import configure_django
+    configure_django()
+    results = []
+    for engine in args.engines.split(","):
+        for size in (int(size) for size in args.sizes.split(",")):
+            try:
+                results.extend(bench_storage(engine, size, args.repeat, args.seed))
+            except Exception as e:
+                # e.g. no mongod reachable; the other engines still run
+                logger.error(f"Skipping {engine} x {size}: {e}")
+    return {"results": results, "peak_rss_mb": peak_rss_mb()}
+
+# --- Comparing Runs ---
+def _indexed(results):
+    keyed = {}
+    for row in results:
+        key = tuple(row[field] for field in ("endpoint", "engine", "size", "operation", "expenses", "concurrency") if field in row)
+        keyed[key] = row
+    return keyed
+
+def compare(baseline, current, threshold):
+    # Yields (key, metric, before, after, regressed) for latencies present in both runs
+    for section in ("api", "storage"):
+        before = _indexed(baseline.get(section, {}).get("results", []))
+        after = _indexed(current.get(section, {}).get("results", []))
+        for key in sorted(set(before) & set(after), key=str):
+            for metric in ("p50_ms", "p95_ms", "p99_ms", "seconds"):
+                old, new = before[key].get(metric), after[key].get(metric)
+                if old and new is not None:
+                    yield (section,) + key, metric, old, new, new > old * (1 + threshold)
+
+def run_compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = 0
+    for key, metric, old, new, regressed in compare(baseline, current, args.threshold):
+        regressions += regressed
+        print(f"{'REGRESSED' if regressed else 'ok':10} {' '.join(map(str, key))} {metric}: {old:.3f} -> {new:.3f} ({(new / old - 1) * 100:+.1f}%)")
+    print(f"{regressions} regressions above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+# --- Command Line ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Expense Tracker load tests and storage micro-benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    api = commands.add_parser("api", help="seed N expenses and load-test the CRUD endpoints")
+    api.add_argument("--expenses", type=int, default=10000, help="expenses seeded before the run (10k to 1M)")
+    api.add_argument("--requests", type=int, default=1000, help="requests per endpoint")
+    api.add_argument("--concurrency", type=int, default=8)
+    api.add_argument("--storage", choices=["memory", "columnar", "sqlite"], default="memory", help="engine for in-process runs")
+    api.add_argument("--url", help="load-test a running server instead of the in-process test client")
+    api.add_argument("--reset", action="store_true", help="with --url: delete every expense on the server first")
+
+    storage = commands.add_parser("storage", help="micro-benchmark the storage engines directly")
+    storage.add_argument("--engines", default="memory,sqlite", help="comma-separated: memory, columnar, sqlite, mongo")
+    storage.add_argument("--sizes", default="10000", help="comma-separated collection sizes")
+    storage.add_argument("--repeat", type=int, default=200, help="timed calls per operation")
+
+    for command in (api, storage):
+        command.add_argument("--seed", type=int, default=0)
+        command.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON file the results are written to")
+
+    diff = commands.add_parser("compare", help="compare two result files and flag latency regressions")
+    diff.add_argument("baseline")
+    diff.add_argument("current")
+    diff.add_argument("--threshold", type=float, default=0.10, help="relative slowdown reported as a regression")
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        return run_compare(args)
+
+    report = {"environment": _environment(args)}
+    report[args.command] = run_api(args) if args.command == "api" else run_storage(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Results written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,158 @@
+# cache.py
+
+import uuid
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+from functools import wraps
+from django.http import HttpResponse, HttpResponseNotModified
+
+# Rendered responses kept per process; least recently used entries are evicted first
+CACHE_MAX_ENTRIES = 256
+
+# --- Shared Data Version (multi-worker deployments) ---
+class MongoDataVersion:
+    # A counter document every worker reads, so a write in one worker invalidates the others' caches
+    DOC_ID = "data_version"
+
+    def __init__(self, collection, async_collection_factory=None):
+        self.collection = collection
+        self.async_collection_factory = async_collection_factory
+
+    def get(self):
+        doc = self.collection.find_one({'_id': self.DOC_ID})
+        return doc['value'] if doc else 0
+
+    async def aget(self):
+        doc = await self.async_collection_factory().find_one({'_id': self.DOC_ID})
+        return doc['value'] if doc else 0
+
+    def bump(self):
+        self.collection.update_one({'_id': self.DOC_ID}, {'$inc': {'value': 1}}, upsert=True)
+
+class ResponseCache:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.version = 0
+        # The in-process counter restarts at 0, so versions (and ETags) carry a per-boot id to keep a
+        # client's ETag from before a restart from matching different data
+        self.boot_id = uuid.uuid4().hex[:8]
+        # Optional MongoDataVersion; the in-process counter is only correct for a single worker
+        self.version_store = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _local_version(self):
+        return f"{self.boot_id}.{self.version}"
+
+    def current_version(self):
+        return self.version_store.get() if self.version_store else self._local_version()
+
+    async def acurrent_version(self):
+        return await self.version_store.aget() if self.version_store else self._local_version()
+
+    def bump(self):
+        # Every write moves to a new data version; entries for older versions can never be served again
+        if self.version_store:
+            self.version_store.bump()
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+response_cache = ResponseCache()
+
+def _request_key(request):
+    query = tuple(sorted((name, tuple(values)) for name, values in request.GET.lists()))
+    return request.path, query, request.META.get('HTTP_ACCEPT', '')
+
+def _etag(version, key):
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+    return f'W/"{version}-{digest}"'
+
+def _etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(',')]
+    return '*' in candidates or etag in candidates or etag[2:] in candidates
+
+# --- View Decorators ---
+def _cached_response(request, version, key):
+    # Returns (etag, response or None); None means the view has to run
+    etag = _etag(version, key)
+    if _etag_matches(request, etag):
+        return etag, HttpResponseNotModified()
+    entry = response_cache.get((version, key))
+    return etag, (HttpResponse(entry[0], content_type=entry[1]) if entry is not None else None)
+
+def _store_response(response, version, key):
+    if hasattr(response, 'render'):
+        response.render()
+    entry = (response.content, response['Content-Type'])
+    response_cache.set((version, key), entry)
+    return HttpResponse(entry[0], content_type=entry[1])
+
+def _tag(response, etag):
+    response['ETag'] = etag
+    response['Vary'] = 'Accept'
+    return response
+
+def cached_view(view):
+    # Serves GET responses from the cache for the current data version, with ETag / If-None-Match
+    if inspect.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await view(request, *args, **kwargs)
+            version, key = await response_cache.acurrent_version(), _request_key(request)
+            etag, response = _cached_response(request, version, key)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                response = _store_response(response, version, key)
+            return _tag(response, etag)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        version, key = response_cache.current_version(), _request_key(request)
+        etag, response = _cached_response(request, version, key)
+        if response is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response = _store_response(response, version, key)
+        return _tag(response, etag)
+    return wrapper
+
+def invalidates_cache(view):
+    # Mutating views move the data version forward, even when they fail part-way through
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            response_cache.bump()
+    return wrapper
@@ -0,0 +1,466 @@
+# columnar_db.py
+
+import threading
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+import numpy as np
+from db import _EPOCH, _COMPARISONS, _date_key, _is_operator_dict, _project, _run_pipeline
+
+# Rows allocated when the columns first grow; capacity doubles from there
+INITIAL_CAPACITY = 1024
+# Deleted rows are dropped once they make up this share of the columns (and at least COMPACT_MIN_ROWS)
+COMPACT_RATIO = 0.25
+COMPACT_MIN_ROWS = 1024
+
+MISSING_DATE = np.iinfo(np.int64).min
+FIELDS = ('product_name', 'amount', 'category', 'date')
+# $dateToString formats computed from the per-row local day instead of per-row strftime
+_DAY_FORMATS = {'%Y-%m': 'M', '%Y-%m-%d': 'D'}
+
+class _Unsupported(Exception):
+    # Raised for a pipeline stage the vectorized path does not cover; it then runs on documents
+    pass
+
+def _to_row_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+class _Strings:
+    # Interned column values: one int32 code per row, -1 for None
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def code(self, value):
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value):
+        # Existing code or None; never interns
+        return -1 if value is None else self.codes.get(value)
+
+    def decode(self, codes):
+        table = np.array(self.values + [None], dtype=object)
+        return table[codes]
+
+    def ranks(self, codes):
+        # Sort keys that follow string order, with None first like MongoDB
+        order = np.argsort(np.array(self.values, dtype=object)) if self.values else np.array([], dtype=np.int64)
+        ranks = np.empty(len(self.values) + 1, dtype=np.int64)
+        ranks[order] = np.arange(len(self.values))
+        ranks[-1] = -1
+        return ranks[codes]
+
+# --- Column-Oriented In-Memory Database ---
+class ColumnarDB:
+    # About 33 bytes per expense: int64 id and date, float64 amount, int32 category/product codes, bool live flag
+    def __init__(self):
+        self.counter = 0
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._size = 0
+        self._dead = 0
+        self._ids = np.empty(0, dtype=np.int64)
+        self._amount = np.empty(0, dtype=np.float64)
+        self._date = np.empty(0, dtype=np.int64)
+        self._category = np.empty(0, dtype=np.int32)
+        self._product = np.empty(0, dtype=np.int32)
+        # Tombstones: False marks a deleted row until the next compaction
+        self._live = np.empty(0, dtype=bool)
+        self._categories = _Strings()
+        self._products = _Strings()
+        # time zone -> local day number per row, filled lazily for date grouping
+        self._local_days = {}
+
+    # --- Storage ---
+    def _columns(self):
+        return ('_ids', '_amount', '_date', '_category', '_product', '_live')
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = len(self._ids)
+        if needed <= capacity:
+            return
+        capacity = max(INITIAL_CAPACITY, capacity)
+        while capacity < needed:
+            capacity *= 2
+        for name in self._columns():
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+    def _append(self, documents):
+        unknown = set().union(*documents) - set(FIELDS) - {'_id'}
+        if unknown:
+            raise ValueError(f"Unsupported field: {', '.join(sorted(unknown))}")
+        count = len(documents)
+        self._reserve(count)
+        start, end = self._size, self._size + count
+        ids = np.arange(self.counter + 1, self.counter + count + 1, dtype=np.int64)
+        self._ids[start:end] = ids
+        self._amount[start:end] = [np.nan if doc.get('amount') is None else doc['amount'] for doc in documents]
+        self._date[start:end] = [MISSING_DATE if _date_key(doc.get('date')) is None else _date_key(doc['date']) for doc in documents]
+        self._category[start:end] = [self._categories.code(doc.get('category')) for doc in documents]
+        self._product[start:end] = [self._products.code(doc.get('product_name')) for doc in documents]
+        self._live[start:end] = True
+        self._size = end
+        self.counter += count
+        for doc, _id in zip(documents, ids):
+            doc['_id'] = str(_id)
+        return [doc['_id'] for doc in documents]
+
+    def _document(self, row):
+        date = self._date[row]
+        amount = self._amount[row]
+        return {
+            '_id': str(self._ids[row]),
+            'product_name': self._products.values[self._product[row]] if self._product[row] >= 0 else None,
+            'amount': None if np.isnan(amount) else float(amount),
+            'category': self._categories.values[self._category[row]] if self._category[row] >= 0 else None,
+            'date': None if date == MISSING_DATE else _EPOCH + timedelta(microseconds=int(date)),
+        }
+
+    def _delete_rows(self, rows):
+        self._live[rows] = False
+        self._dead += len(rows)
+        if self._dead >= COMPACT_MIN_ROWS and self._dead >= COMPACT_RATIO * self._size:
+            self.compact()
+
+    def compact(self):
+        # Drops tombstoned rows and strings no live row uses any more
+        with self._lock:
+            live = self._live[:self._size]
+            for name in self._columns():
+                setattr(self, name, getattr(self, name)[:self._size][live].copy())
+            self._local_days = {tz: days[live] for tz, days in self._local_days.items() if len(days) == len(live)}
+            self._size, self._dead = len(self._ids), 0
+            self._category = self._reintern(self._categories, '_categories', self._category)
+            self._product = self._reintern(self._products, '_products', self._product)
+
+    def _reintern(self, strings, attr, codes):
+        used = np.unique(codes[codes >= 0])
+        fresh = _Strings()
+        remap = np.full(len(strings.values) + 1, -1, dtype=np.int32)
+        for code in used:
+            remap[code] = fresh.code(strings.values[code])
+        setattr(self, attr, fresh)
+        return remap[codes]
+
+    # --- Query Evaluation (vectorized over all rows) ---
+    def _string_condition(self, strings, codes, op, arg):
+        if op in ('$eq', '$ne'):
+            code = strings.lookup(arg)
+            mask = codes == code if code is not None else np.zeros(len(codes), dtype=bool)
+            return ~mask if op == '$ne' else mask
+        if op in ('$in', '$nin'):
+            wanted = [code for code in (strings.lookup(value) for value in arg) if code is not None]
+            mask = np.isin(codes, wanted)
+            return ~mask if op == '$nin' else mask
+        # Ordering comparisons on strings are rare; evaluate them on the decoded values
+        compare = _COMPARISONS[op]
+        return np.fromiter((value is not None and compare(value, arg) for value in strings.decode(codes)), dtype=bool, count=len(codes))
+
+    def _numeric_condition(self, values, missing, op, arg, convert):
+        if op in ('$in', '$nin'):
+            converted = [convert(value) for value in arg if value is not None]
+            mask = np.isin(values, [value for value in converted if value is not None])
+            if None in arg:
+                mask |= missing
+            return ~mask if op == '$nin' else mask
+        if arg is None:
+            if op == '$eq':
+                return missing.copy()
+            if op == '$ne':
+                return ~missing
+            return np.zeros(len(values), dtype=bool)
+        value = convert(arg)
+        if value is None:
+            # e.g. a MongoDB ObjectId looked up in this engine
+            return np.full(len(values), op == '$ne')
+        if op == '$ne':
+            return missing | (values != value)
+        return ~missing & _COMPARISONS[op](values, value)
+
+    def _condition(self, field, op, arg):
+        if op not in _COMPARISONS:
+            raise ValueError(f"Unsupported query operator: {op}")
+        n = self._size
+        if field == 'category':
+            return self._string_condition(self._categories, self._category[:n], op, arg)
+        if field == 'product_name':
+            return self._string_condition(self._products, self._product[:n], op, arg)
+        if field == 'amount':
+            amounts = self._amount[:n]
+            return self._numeric_condition(amounts, np.isnan(amounts), op, arg, lambda value: value if isinstance(value, (int, float)) else None)
+        if field == 'date':
+            dates = self._date[:n]
+            return self._numeric_condition(dates, dates == MISSING_DATE, op, arg, _date_key)
+        if field == '_id':
+            ids = self._ids[:n]
+            return self._numeric_condition(ids, np.zeros(n, dtype=bool), op, arg, _to_row_id)
+        raise ValueError(f"Unsupported field: {field}")
+
+    def _mask(self, query):
+        mask = self._live[:self._size].copy()
+        for key, condition in (query or {}).items():
+            if key == '$and':
+                for sub in condition:
+                    mask &= self._mask(sub)
+            elif key == '$or':
+                mask &= np.logical_or.reduce([self._mask(sub) for sub in condition]) if condition else False
+            else:
+                conditions = condition.items() if _is_operator_dict(condition) else [('$eq', condition)]
+                for op, arg in conditions:
+                    mask &= self._condition(key, op, arg)
+        return mask
+
+    def _rows(self, query):
+        # Matching live rows in id order; a lone _id equality is a binary search instead of a scan
+        if query and set(query) == {'_id'} and not _is_operator_dict(query['_id']):
+            _id = _to_row_id(query['_id'])
+            row = np.searchsorted(self._ids[:self._size], _id) if _id is not None else self._size
+            if row < self._size and self._ids[row] == _id and self._live[row]:
+                return np.array([row])
+            return np.array([], dtype=np.int64)
+        return np.flatnonzero(self._mask(query))
+
+    def _sort_key(self, field, rows, direction):
+        if field == 'date':
+            key = self._date[rows]
+        elif field == '_id':
+            key = self._ids[rows]
+        elif field == 'amount':
+            key = np.nan_to_num(self._amount[rows], nan=-np.inf)
+            return -key if direction < 0 else key
+        elif field == 'category':
+            key = self._categories.ranks(self._category[rows])
+        elif field == 'product_name':
+            key = self._products.ranks(self._product[rows])
+        else:
+            raise ValueError(f"Unsupported sort field: {field}")
+        # Bitwise NOT reverses integer order without overflowing on the missing-date sentinel
+        return ~key if direction < 0 else key
+
+    def _ordered(self, rows, sort, limit=0):
+        if sort:
+            (field, direction), rest = sort[0], sort[1:]
+            leading = self._sort_key(field, rows, direction)
+            if limit and len(rows) > limit:
+                # Top-k: only rows whose leading key is within the first `limit` values (ties included)
+                # can make the page, so the full sort runs on those instead of every match
+                selected = leading <= np.partition(leading, limit - 1)[limit - 1]
+                rows, leading = rows[selected], leading[selected]
+            keys = [leading] + [self._sort_key(field, rows, direction) for field, direction in rest]
+            rows = rows[np.lexsort(keys[::-1])]
+        return rows[:limit] if limit else rows
+
+    # --- Vectorized Aggregation ---
+    def _local_day_numbers(self, time_zone):
+        # Days since 1970-01-01 in `time_zone`, one per row; extended as rows are added
+        days = self._local_days.get(time_zone)
+        done = 0 if days is None else len(days)
+        if done < self._size:
+            import pandas as pd
+            dates = self._date[done:self._size]
+            present = dates != MISSING_DATE
+            local = pd.DatetimeIndex(np.where(present, dates, 0).astype('datetime64[us]')).tz_localize('UTC').tz_convert(time_zone).tz_localize(None)
+            fresh = np.where(present, local.values.astype('datetime64[D]').astype(np.int64), MISSING_DATE)
+            days = fresh if days is None else np.concatenate([days, fresh])
+            self._local_days[time_zone] = days
+        return days[:self._size]
+
+    def _local_day(self, key, time_zone):
+        local = (_EPOCH + timedelta(microseconds=key)).astimezone(ZoneInfo(time_zone))
+        return (local.date() - _EPOCH.date()).days
+
+    def _select(self, column, selection):
+        # `selection` is a slice (every row, no copy) or a boolean mask over the rows in use
+        return column[:self._size][selection]
+
+    def _all_rows(self):
+        return slice(None) if not self._dead else self._live[:self._size].copy()
+
+    def _group_keys(self, expression, selection):
+        # (group code per selected row, function turning a code back into the group's _id)
+        if expression is None:
+            return np.zeros(len(self._select(self._ids, selection)), dtype=np.int64), lambda code: None
+        if expression in ('$category', '$product_name'):
+            strings, codes = (self._categories, self._category) if expression == '$category' else (self._products, self._product)
+            return self._select(codes, selection) + 1, lambda code: strings.values[code - 1] if code else None
+        if isinstance(expression, dict) and set(expression) == {'$dateToString'}:
+            spec = expression['$dateToString']
+            unit = _DAY_FORMATS.get(spec.get('format'))
+            if spec.get('date') != '$date' or unit is None:
+                raise _Unsupported()
+            days = self._select(self._local_day_numbers(spec.get('timezone', 'UTC')), selection)
+            missing = days == MISSING_DATE
+            present = days[~missing] if missing.any() else days
+            if not len(present):
+                return np.zeros(len(days), dtype=np.int64), lambda code: None
+            # Months come from a lookup table over the covered days rather than a per-row calendar conversion
+            low = present.min()
+            periods = np.arange(low, present.max() + 1).astype('datetime64[D]').astype(f'datetime64[{unit}]').astype(np.int64)
+            base = periods[0]
+            codes = (periods - base + 1)[np.where(missing, 0, days - low)]
+            codes[missing] = 0
+            return codes, lambda code: str(np.datetime64(int(code + base - 1), unit)) if code else None
+        raise _Unsupported()
+
+    def _group(self, selection, spec):
+        codes, key_of = self._group_keys(spec['_id'], selection)
+        size = int(codes.max()) + 1 if len(codes) else 0
+        counts = np.bincount(codes, minlength=size)
+        amounts = self._select(self._amount, selection)
+        numeric = ~np.isnan(amounts)
+        if numeric.all():
+            numeric = slice(None)
+        columns = {}
+        for field, accumulator in spec.items():
+            if field == '_id':
+                continue
+            (op, expression), = accumulator.items()
+            if op == '$sum' and isinstance(expression, (int, float)) and not isinstance(expression, bool):
+                columns[field] = counts * expression
+            elif expression != '$amount':
+                raise _Unsupported()
+            elif op == '$sum':
+                columns[field] = np.bincount(codes[numeric], weights=amounts[numeric], minlength=size)
+            elif op == '$avg':
+                sums = np.bincount(codes[numeric], weights=amounts[numeric], minlength=size)
+                present = np.bincount(codes[numeric], minlength=size)
+                columns[field] = np.where(present > 0, sums / np.maximum(present, 1), np.nan)
+            elif op in ('$min', '$max'):
+                values = np.full(size, np.inf if op == '$min' else -np.inf)
+                (np.minimum if op == '$min' else np.maximum).at(values, codes[numeric], amounts[numeric])
+                columns[field] = np.where(np.isinf(values), np.nan, values)
+            else:
+                raise _Unsupported()
+        results = []
+        for code in np.flatnonzero(counts):
+            row = {'_id': key_of(int(code))}
+            for field, values in columns.items():
+                value = values[code]
+                row[field] = None if isinstance(value, float) and np.isnan(value) else (int(value) if values.dtype.kind == 'i' else float(value))
+            results.append(row)
+        return results
+
+    def _aggregate(self, selection, pipeline):
+        stages = list(pipeline)
+        while stages and '$match' in stages[0]:
+            mask = self._mask(stages.pop(0)['$match'])
+            selection = mask if isinstance(selection, slice) else selection & mask
+        if stages and '$group' in stages[0]:
+            try:
+                return _run_pipeline(self._group(selection, stages[0]['$group']), stages[1:])
+            except _Unsupported:
+                pass
+        if stages and '$facet' in stages[0]:
+            facets = {field: self._aggregate(selection, sub_pipeline) for field, sub_pipeline in stages[0]['$facet'].items()}
+            return _run_pipeline([facets], stages[1:])
+        rows = self._select(np.arange(len(self._ids)), selection)
+        sort, limit = None, 0
+        if stages and '$sort' in stages[0] and set(stages[0]['$sort']) <= set(FIELDS) | {'_id'}:
+            sort = list(stages.pop(0)['$sort'].items())
+            if stages and '$limit' in stages[0]:
+                limit = stages.pop(0)['$limit']
+        return _run_pipeline([self._document(row) for row in self._ordered(rows, sort, limit)], stages)
+
+    # --- Collection API ---
+    def insert_one(self, data):
+        with self._lock:
+            inserted_id, = self._append([data])
+        return type('obj', (object,), {'inserted_id': inserted_id})
+
+    def insert_many(self, documents, ordered=True):
+        documents = list(documents)
+        with self._lock:
+            inserted_ids = self._append(documents) if documents else []
+        return type('obj', (object,), {'inserted_ids': inserted_ids})
+
+    def find(self, query=None, projection=None, sort=None, limit=0):
+        with self._lock:
+            rows = self._ordered(self._rows(query), sort, limit)
+            return [_project(self._document(row), projection) for row in rows]
+
+    def find_one(self, query=None, projection=None):
+        with self._lock:
+            rows = self._rows(query)
+            return _project(self._document(rows[0]), projection) if len(rows) else None
+
+    def aggregate(self, pipeline):
+        with self._lock:
+            return self._aggregate(self._all_rows(), pipeline)
+
+    def delete_many(self, query=None):
+        with self._lock:
+            if not query:
+                deleted_count = self._size - self._dead
+                self._clear()
+            else:
+                rows = self._rows(query)
+                deleted_count = len(rows)
+                self._delete_rows(rows)
+        return type('obj', (object,), {'deleted_count': deleted_count})
+
+    def delete_one(self, query):
+        with self._lock:
+            rows = self._rows(query)[:1]
+            self._delete_rows(rows)
+        return type('obj', (object,), {'deleted_count': len(rows)})
+
+    def _set(self, row, update_data):
+        unsupported = set(update_data) - {'$set'}
+        if unsupported:
+            raise ValueError(f"Unsupported update operator: {', '.join(sorted(unsupported))}")
+        changes = {field: value for field, value in update_data.get('$set', {}).items() if field != '_id'}
+        unknown = set(changes) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unsupported field: {', '.join(sorted(unknown))}")
+        before = self._document(row)
+        if 'amount' in changes:
+            self._amount[row] = np.nan if changes['amount'] is None else changes['amount']
+        if 'category' in changes:
+            self._category[row] = self._categories.code(changes['category'])
+        if 'product_name' in changes:
+            self._product[row] = self._products.code(changes['product_name'])
+        if 'date' in changes:
+            key = _date_key(changes['date'])
+            self._date[row] = MISSING_DATE if key is None else key
+            for time_zone, days in self._local_days.items():
+                if row < len(days):
+                    days[row] = MISSING_DATE if key is None else self._local_day(key, time_zone)
+        return before, any(before.get(field) != value for field, value in changes.items())
+
+    def update_one(self, query, update_data):
+        with self._lock:
+            rows = self._rows(query)
+            if not len(rows):
+                return type('obj', (object,), {'matched_count': 0, 'modified_count': 0})
+            _, modified = self._set(rows[0], update_data)
+        return type('obj', (object,), {'matched_count': 1, 'modified_count': int(modified)})
+
+    def find_one_and_update(self, query, update_data, return_document=False):
+        # return_document mirrors pymongo.ReturnDocument: False = BEFORE, True = AFTER
+        with self._lock:
+            rows = self._rows(query)
+            if not len(rows):
+                return None
+            before, _ = self._set(rows[0], update_data)
+            return self._document(rows[0]) if return_document else before
+
+    def find_one_and_delete(self, query):
+        with self._lock:
+            rows = self._rows(query)[:1]
+            doc = self._document(rows[0]) if len(rows) else None
+            self._delete_rows(rows)
+        return doc
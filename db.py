@@ -1,65 +1,532 @@
 # db.py
 
+import os
 import logging
-from pymongo import MongoClient
+import operator
+import threading
+from collections import defaultdict
+from itertools import chain, islice
+from pymongo import MongoClient, IndexModel
 import pymongo
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from sortedcontainers import SortedList
+from totals import InMemoryTotals, MongoTotals, SQLiteTotals
+from metrics import InstrumentedCollection, InstrumentedAsyncDatabase
 
 logger = logging.getLogger(__name__)
 
 # MongoDB Configuration
-MONGO_URI = "mongodb://localhost:27017/"
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
 MONGO_DB = "expense_tracker"
 MONGO_COLLECTION = "expenses"
+MONGO_TOTALS_COLLECTION = "expense_totals"
+MONGO_META_COLLECTION = "expense_meta"
+# How long the first database access waits for MongoDB before falling back to memory
+MONGO_TIMEOUT_MS = int(os.environ.get("MONGO_TIMEOUT_MS", "2000"))
+# "mongo" (falls back to memory when unreachable), "sqlite", "memory" or "columnar"
+STORAGE_ENGINE = os.environ.get("EXPENSE_TRACKER_STORAGE", "mongo")
 
-# Connect to MongoDB
-try:
-    mongo_client = MongoClient(MONGO_URI)
-    db = mongo_client[MONGO_DB]
-    collection = db[MONGO_COLLECTION]
-    logger.info("Connected to MongoDB successfully")
-except pymongo.errors.ConnectionFailure as e:
-    logger.error(f"Could not connect to MongoDB: {e}")
-    mongo_client = None
+# --- MongoDB Index Definitions ---
+# Ensured every time the connection is opened; creating an index that already exists is a no-op
+EXPENSE_INDEXES = [
+    # Keyset listing, month/start/end ranges and the dashboard's $match + $sort
+    IndexModel([('date', 1), ('_id', 1)], name='date_id'),
+    # Category filters, alone or with a date range, still returned in listing order
+    IndexModel([('category', 1), ('date', 1), ('_id', 1)], name='category_date_id'),
+]
+TOTALS_INDEXES = [
+    # totals.by(kind): {'kind': ..., 'count': {'$gt': 0}} sorted by key
+    IndexModel([('kind', 1), ('key', 1)], name='kind_key'),
+]
+
+# --- Query Matching (Subset of MongoDB Query Language) ---
+_COMPARISONS = {
+    '$eq': operator.eq,
+    '$ne': operator.ne,
+    '$gt': operator.gt,
+    '$gte': operator.ge,
+    '$lt': operator.lt,
+    '$lte': operator.le,
+    '$in': lambda value, arg: value in arg,
+    '$nin': lambda value, arg: value not in arg,
+}
+
+def _is_operator_dict(condition):
+    return isinstance(condition, dict) and bool(condition) and all(key.startswith('$') for key in condition)
+
+def _matches(doc, query):
+    for key, condition in (query or {}).items():
+        if key == '$and':
+            if not all(_matches(doc, sub) for sub in condition):
+                return False
+        elif key == '$or':
+            if not any(_matches(doc, sub) for sub in condition):
+                return False
+        elif _is_operator_dict(condition):
+            value = doc.get(key)
+            for op, arg in condition.items():
+                # Like MongoDB, range operators never match a missing field
+                if value is None and op not in ('$eq', '$ne', '$in', '$nin'):
+                    return False
+                if not _COMPARISONS[op](value, arg):
+                    return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+def _project(doc, projection):
+    if not projection:
+        return dict(doc)
+    included = [field for field, flag in projection.items() if flag]
+    if included:
+        projected = {field: doc[field] for field in included if field in doc}
+        if projection.get('_id', 1) and '_id' in doc:
+            projected['_id'] = doc['_id']
+        return projected
+    return {field: value for field, value in doc.items() if projection.get(field, 1)}
+
+def _sorted(docs, sort):
+    # Stable multi-key sort: apply keys from least to most significant
+    for field, direction in reversed(sort or []):
+        docs.sort(key=lambda doc: (doc.get(field) is not None, doc.get(field)), reverse=direction < 0)
+    return docs
+
+# --- Aggregation Expressions (Subset of MongoDB Aggregation Framework) ---
+def _date_to_string(value, spec):
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        # MongoDB stores naive datetimes as UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(ZoneInfo(spec.get('timezone', 'UTC'))).strftime(spec['format'])
+
+def _evaluate(expression, doc):
+    if isinstance(expression, str) and expression.startswith('$'):
+        return doc.get(expression[1:])
+    if isinstance(expression, dict) and '$dateToString' in expression:
+        spec = expression['$dateToString']
+        return _date_to_string(_evaluate(spec['date'], doc), spec)
+    return expression
+
+def _accumulate(accumulator, values):
+    (op, _), = accumulator.items()
+    values = [value for value in values if value is not None]
+    if op == '$sum':
+        return sum(value for value in values if isinstance(value, (int, float)))
+    if op == '$avg':
+        return sum(values) / len(values) if values else None
+    if op == '$min':
+        return min(values, default=None)
+    if op == '$max':
+        return max(values, default=None)
+    raise ValueError(f"Unsupported accumulator: {op}")
+
+def _group(docs, spec):
+    groups = {}
+    for doc in docs:
+        groups.setdefault(_evaluate(spec['_id'], doc), []).append(doc)
+    results = []
+    for key, members in groups.items():
+        row = {'_id': key}
+        for field, accumulator in spec.items():
+            if field != '_id':
+                (_, expression), = accumulator.items()
+                row[field] = _accumulate(accumulator, [_evaluate(expression, doc) for doc in members])
+        results.append(row)
+    return results
+
+def _run_pipeline(docs, pipeline):
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == '$match':
+            docs = [doc for doc in docs if _matches(doc, spec)]
+        elif name == '$group':
+            docs = _group(docs, spec)
+        elif name == '$sort':
+            docs = _sorted(docs, list(spec.items()))
+        elif name == '$limit':
+            docs = docs[:spec]
+        elif name == '$project':
+            docs = [_project(doc, spec) for doc in docs]
+        elif name == '$facet':
+            docs = [{field: _run_pipeline(list(docs), sub_pipeline) for field, sub_pipeline in spec.items()}]
+        else:
+            raise ValueError(f"Unsupported pipeline stage: {name}")
+    return docs
+
+# --- Index Planning Helpers ---
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def _date_key(value):
+    # Integer microseconds since the epoch, so index order matches datetime order exactly
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+def _tighter(a, b, pick):
+    if a is None or b is None:
+        return b if a is None else a
+    return pick(a, b)
+
+def _merge_bounds(bounds, other):
+    return _tighter(bounds[0], other[0], max), _tighter(bounds[1], other[1], min)
+
+def _date_bounds(query):
+    # Inclusive (low, high) timestamps implied by the query; None means unbounded.
+    # Bounds are conservative, the full query is still evaluated on every candidate.
+    bounds = (None, None)
+    for key, condition in (query or {}).items():
+        if key == '$and':
+            for sub in condition:
+                bounds = _merge_bounds(bounds, _date_bounds(sub))
+        elif key == '$or':
+            branches = [_date_bounds(sub) for sub in condition]
+            low = None if any(b[0] is None for b in branches) else min(b[0] for b in branches)
+            high = None if any(b[1] is None for b in branches) else max(b[1] for b in branches)
+            bounds = _merge_bounds(bounds, (low, high))
+        elif key == 'date':
+            if not _is_operator_dict(condition):
+                condition = {'$eq': condition}
+            keys = {op: _date_key(value) for op, value in condition.items()}
+            lows = [keys[op] for op in ('$eq', '$gt', '$gte') if keys.get(op) is not None]
+            highs = [keys[op] for op in ('$eq', '$lt', '$lte') if keys.get(op) is not None]
+            bounds = _merge_bounds(bounds, (max(lows, default=None), min(highs, default=None)))
+    return bounds
+
+def _equality_keys(query, field):
+    # Values `field` must take according to the query, or None when unconstrained
+    keys = None
+    for key, condition in (query or {}).items():
+        if key == '$and':
+            for sub in condition:
+                sub_keys = _equality_keys(sub, field)
+                if sub_keys is not None:
+                    keys = sub_keys if keys is None else keys & sub_keys
+        elif key == field:
+            if not _is_operator_dict(condition):
+                field_keys = {condition}
+            elif set(condition) == {'$in'}:
+                field_keys = set(condition['$in'])
+            elif set(condition) == {'$eq'}:
+                field_keys = {condition['$eq']}
+            else:
+                continue
+            keys = field_keys if keys is None else keys & field_keys
+    return keys
+
+def _sort_direction(sort):
+    # 1 or -1 when the requested order matches the date index, None otherwise
+    fields = [field for field, _ in sort or []]
+    directions = {direction for _, direction in sort or []}
+    if fields in (['date'], ['date', '_id']) and len(directions) == 1:
+        return directions.pop()
+    return None
+
+def _apply_set(doc, update_data):
+    unsupported = set(update_data) - {'$set'}
+    if unsupported:
+        raise ValueError(f"Unsupported update operator: {', '.join(sorted(unsupported))}")
+    changes = {field: value for field, value in update_data.get('$set', {}).items() if field != '_id'}
+    modified = any(doc.get(field, object()) != value for field, value in changes.items())
+    doc.update(changes)
+    return modified
 
 # --- In-Memory Fallback Database (For No-Mongo Environments) ---
 class InMemoryDB:
     def __init__(self):
-        self.expenses = []
         self.counter = 0
+        self._clear()
+
+    def _clear(self):
+        self.expenses = {}
+        # Secondary indexes: category -> ids, and (date key, _id) pairs in sorted order
+        self._by_category = defaultdict(set)
+        self._by_date = SortedList()
+        self._undated = set()
+
+    # --- Index maintenance ---
+    def _index(self, doc):
+        # O(log n) per document
+        _id = doc['_id']
+        self._by_category[doc.get('category')].add(_id)
+        key = _date_key(doc.get('date'))
+        if key is None:
+            self._undated.add(_id)
+            return
+        self._by_date.add((key, _id))
+
+    def _index_many(self, docs):
+        # Bulk load: SortedList.update sorts once when the batch is large relative to the index
+        dated = []
+        for doc in docs:
+            _id = doc['_id']
+            self._by_category[doc.get('category')].add(_id)
+            key = _date_key(doc.get('date'))
+            if key is None:
+                self._undated.add(_id)
+            else:
+                dated.append((key, _id))
+        self._by_date.update(dated)
+
+    def _unindex(self, doc):
+        _id = doc['_id']
+        members = self._by_category.get(doc.get('category'))
+        if members is not None:
+            members.discard(_id)
+            if not members:
+                del self._by_category[doc.get('category')]
+        key = _date_key(doc.get('date'))
+        if key is None:
+            self._undated.discard(_id)
+            return
+        self._by_date.discard((key, _id))
+
+    # --- Query planning ---
+    def _candidates(self, query, direction=None):
+        # Returns (documents, ordered); ordered means already sorted by (date, _id) in `direction`
+        ids = _equality_keys(query, '_id')
+        if ids is not None:
+            return [self.expenses[_id] for _id in ids if _id in self.expenses], False
+
+        categories = _equality_keys(query, 'category')
+        if categories is not None:
+            categories = set().union(*(self._by_category.get(category, ()) for category in categories))
+
+        low, high = _date_bounds(query)
+        bounded = low is not None or high is not None
+        # Keys are integers, so (high + 1,) sorts after every (high, _id) pair
+        lo = self._by_date.bisect_left((low,)) if low is not None else 0
+        hi = self._by_date.bisect_left((high + 1,)) if high is not None else len(self._by_date)
 
+        if categories is not None and (not bounded or len(categories) <= hi - lo):
+            return [self.expenses[_id] for _id in categories], False
+        if not bounded and direction is None:
+            return list(self.expenses.values()), False
+
+        ids = (_id for _, _id in self._by_date.islice(lo, hi, reverse=direction == -1))
+        if not bounded:
+            # Like MongoDB, documents without a date sort before every dated one
+            undated = sorted(self._undated)
+            ids = chain(undated, ids) if direction != -1 else chain(ids, reversed(undated))
+        if categories is not None:
+            ids = (_id for _id in ids if _id in categories)
+        return (self.expenses[_id] for _id in ids), True
+
+    def _first_match(self, query):
+        docs, _ = self._candidates(query)
+        return next((doc for doc in docs if _matches(doc, query)), None)
+
+    # --- Collection API ---
     def insert_one(self, data):
         self.counter += 1
         data['_id'] = str(self.counter)
-        self.expenses.append(data)
+        self.expenses[data['_id']] = data
+        self._index(data)
         return type('obj', (object,), {'inserted_id': data['_id']})
 
-    def find(self, query=None, projection=None):
-        return self.expenses
+    def insert_many(self, documents, ordered=True):
+        documents = list(documents)
+        for data in documents:
+            self.counter += 1
+            data['_id'] = str(self.counter)
+            self.expenses[data['_id']] = data
+        self._index_many(documents)
+        return type('obj', (object,), {'inserted_ids': [data['_id'] for data in documents]})
+
+    def find(self, query=None, projection=None, sort=None, limit=0):
+        direction = _sort_direction(sort)
+        docs, ordered = self._candidates(query, direction)
+        docs = (doc for doc in docs if _matches(doc, query))
+        if not ordered:
+            docs = _sorted(list(docs), sort)
+        if limit:
+            docs = islice(docs, limit)
+        return [_project(doc, projection) for doc in docs]
+
+    def find_one(self, query=None, projection=None):
+        doc = self._first_match(query)
+        return _project(doc, projection) if doc is not None else None
 
     def aggregate(self, pipeline):
-        if pipeline and pipeline[0].get('$group'):
-            total = sum(expense['amount'] for expense in self.expenses)
-            return [{"_id": None, "total": total}]
-        return []
+        if pipeline and '$match' in pipeline[0]:
+            query = pipeline[0]['$match']
+            docs, _ = self._candidates(query)
+            return _run_pipeline([doc for doc in docs if _matches(doc, query)], pipeline[1:])
+        return _run_pipeline(list(self.expenses.values()), pipeline)
 
     def delete_many(self, query=None):
-        self.expenses = []
+        if not query:
+            deleted_count = len(self.expenses)
+            self._clear()
+            return type('obj', (object,), {'deleted_count': deleted_count})
+        docs, _ = self._candidates(query)
+        matched = [doc for doc in docs if _matches(doc, query)]
+        for doc in matched:
+            self._remove(doc)
+        return type('obj', (object,), {'deleted_count': len(matched)})
 
     def delete_one(self, query):
-        _id = query.get("_id")
-        if _id:
-            initial_len = len(self.expenses)
-            self.expenses = [exp for exp in self.expenses if str(exp['_id']) != str(_id)]
-            deleted_count = 1 if len(self.expenses) < initial_len else 0
-            return type('obj', (object,), {'deleted_count': deleted_count})
-        return type('obj', (object,), {'deleted_count': 0})
+        doc = self._first_match(query)
+        if doc is None:
+            return type('obj', (object,), {'deleted_count': 0})
+        self._remove(doc)
+        return type('obj', (object,), {'deleted_count': 1})
+
+    def _remove(self, doc):
+        self._unindex(doc)
+        del self.expenses[doc['_id']]
+
+    def _update(self, doc, update_data):
+        self._unindex(doc)
+        try:
+            return _apply_set(doc, update_data)
+        finally:
+            self._index(doc)
 
     def update_one(self, query, update_data):
-        # Optional: future support
-        return type('obj', (object,), {'matched_count': 0, 'modified_count': 0})
+        doc = self._first_match(query)
+        if doc is None:
+            return type('obj', (object,), {'matched_count': 0, 'modified_count': 0})
+        modified = self._update(doc, update_data)
+        return type('obj', (object,), {'matched_count': 1, 'modified_count': int(modified)})
+
+    def find_one_and_update(self, query, update_data, return_document=False):
+        # return_document mirrors pymongo.ReturnDocument: False = BEFORE, True = AFTER
+        doc = self._first_match(query)
+        if doc is None:
+            return None
+        before = dict(doc)
+        self._update(doc, update_data)
+        return dict(doc) if return_document else before
+
+    def find_one_and_delete(self, query):
+        doc = self._first_match(query)
+        if doc is not None:
+            self._remove(doc)
+        return doc
+
+# --- Lazy Connection ---
+def ensure_indexes(db):
+    for name, indexes in ((MONGO_COLLECTION, EXPENSE_INDEXES), (MONGO_TOTALS_COLLECTION, TOTALS_INDEXES)):
+        try:
+            created = db[name].create_indexes(indexes)
+            logger.info(f"Indexes on {name}: {', '.join(created)}")
+        except pymongo.errors.OperationFailure as e:
+            # e.g. an index of the same name with different keys; queries still work, only slower
+            logger.error(f"Could not create indexes on {name}: {e}")
+
+mongo_client = None
+async_db = None
+durable_collection = None
+_storage = None
+_storage_lock = threading.Lock()
+
+def _open_mongo():
+    global mongo_client
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=MONGO_TIMEOUT_MS)
+    try:
+        # MongoClient connects in the background; ping to find out now whether the server is there
+        client.admin.command('ping')
+    except pymongo.errors.PyMongoError as e:
+        logger.error(f"Could not connect to MongoDB: {e}")
+        client.close()
+        return None
+    mongo_client = client
+    db = client[MONGO_DB]
+    collection = InstrumentedCollection(db[MONGO_COLLECTION], MONGO_COLLECTION)
+    logger.info("Connected to MongoDB successfully")
+    ensure_indexes(db)
+    return {
+        'engine': 'mongodb',
+        'collection': collection,
+        'totals': MongoTotals(InstrumentedCollection(db[MONGO_TOTALS_COLLECTION], MONGO_TOTALS_COLLECTION), collection),
+        'meta_collection': InstrumentedCollection(db[MONGO_META_COLLECTION], MONGO_META_COLLECTION),
+    }
+
+def _open_in_memory():
+    global durable_collection
+    from durable_memory import DurableInMemoryDB, INMEMORY_DATA_DIR
+    totals = InMemoryTotals()
+    if INMEMORY_DATA_DIR:
+        # Snapshot + operation log recovery, then the running totals from the recovered state
+        collection = durable_collection = DurableInMemoryDB(INMEMORY_DATA_DIR)
+        totals.rebuild(collection)
+    else:
+        logger.warning("Using in-memory database; expenses are lost when the server stops.")
+        collection = InMemoryDB()
+    return {'engine': 'memory', 'collection': InstrumentedCollection(collection, MONGO_COLLECTION), 'totals': totals, 'meta_collection': None}
+
+def _open_sqlite():
+    from sqlite_db import SQLiteDB, SQLITE_PATH
+    collection = SQLiteDB(SQLITE_PATH)
+    totals = SQLiteTotals(collection)
+    # Triggers keep the totals in step with every write; only files that predate them need one full pass.
+    # `python totals.py verify` checks them against the expenses on demand.
+    if not totals.seeded():
+        logger.info("Rebuilding running totals from the SQLite expenses table")
+        totals.rebuild(collection)
+    logger.info(f"Using SQLite database {SQLITE_PATH}")
+    return {'engine': 'sqlite', 'collection': InstrumentedCollection(collection, MONGO_COLLECTION), 'totals': totals, 'meta_collection': None}
+
+def _open_columnar():
+    from columnar_db import ColumnarDB
+    logger.warning("Using columnar in-memory database; expenses are lost when the server stops.")
+    return {'engine': 'columnar', 'collection': InstrumentedCollection(ColumnarDB(), MONGO_COLLECTION), 'totals': InMemoryTotals(), 'meta_collection': None}
+
+def connect():
+    # Chooses the storage engine on first use; later calls return the same objects
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            if STORAGE_ENGINE == 'sqlite':
+                _storage = _open_sqlite()
+            elif STORAGE_ENGINE == 'memory':
+                _storage = _open_in_memory()
+            elif STORAGE_ENGINE == 'columnar':
+                _storage = _open_columnar()
+            else:
+                _storage = _open_mongo()
+                if _storage is None:
+                    logger.warning("MongoDB not available.")
+                    _storage = _open_in_memory()
+    return _storage
+
+def close_storage():
+    # Flushes and closes the in-memory operation log; anything still writing (the insert batcher) must be stopped first
+    if durable_collection is not None:
+        durable_collection.close()
+
+def storage_engine():
+    return connect()['engine']
+
+def using_mongo():
+    return storage_engine() == 'mongodb'
+
+class _Deferred:
+    # Stands in for a storage object so that importing this module does not open a connection
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(connect()[self._name], attr)
+
+    def __repr__(self):
+        return f"<deferred {self._name}>"
+
+collection = _Deferred('collection')
+totals = _Deferred('totals')
+meta_collection = _Deferred('meta_collection')
 
-# --- Fallback to In-Memory ---
-if not mongo_client:
-    logger.warning("MongoDB not available. Using in-memory database.")
-    collection = InMemoryDB()
+# --- Async Access (ASGI production mode) ---
+def get_async_database():
+    # One AsyncMongoClient per worker, created inside its event loop on first use; None on the in-memory fallback
+    global async_db
+    if not using_mongo():
+        return None
+    if async_db is None:
+        from pymongo import AsyncMongoClient
+        async_db = InstrumentedAsyncDatabase(AsyncMongoClient(MONGO_URI, serverSelectionTimeoutMS=MONGO_TIMEOUT_MS)[MONGO_DB])
+    return async_db
@@ -0,0 +1,87 @@
+# diagnostics.py
+
+import sys
+import logging
+from datetime import datetime, timezone
+
+COLLSCAN = "COLLSCAN"
+
+def _stages(explain):
+    # Every plan stage named in an explain document, for find and aggregate, classic or SBE plans
+    if isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == 'stage' and isinstance(value, str):
+                yield value
+            elif key != 'rejectedPlans':
+                yield from _stages(value)
+    elif isinstance(explain, list):
+        for item in explain:
+            yield from _stages(item)
+
+# --- Queries Issued by backend.py ---
+def backend_queries():
+    # (name, explain command, full scan expected) for each read the API performs
+    from bson import ObjectId
+    from django.http import QueryDict
+    import backend
+    from db import MONGO_COLLECTION, MONGO_TOTALS_COLLECTION
+    from totals import MONTH
+
+    month = datetime.now(timezone.utc).strftime("%Y-%m")
+    cursor = backend._encode_cursor({'date': datetime.now(timezone.utc), '_id': ObjectId()})
+
+    def listing(params):
+        query, page_size = backend._list_query(QueryDict(params))
+        return {'find': MONGO_COLLECTION, 'filter': query, 'projection': backend.EXPENSE_PROJECTION,
+                'sort': dict(backend.EXPENSE_SORT), 'limit': page_size + 1}
+
+    def summary(params, group):
+        query = backend._expense_filter(QueryDict(params))
+        return {'aggregate': MONGO_COLLECTION, 'pipeline': backend._summary_pipeline(query, group), 'cursor': {}}
+
+    return [
+        ("list: first page", listing(""), False),
+        ("list: next page", listing(f"cursor={cursor}"), False),
+        ("list: month", listing(f"month={month}"), False),
+        ("list: month + cursor", listing(f"month={month}&cursor={cursor}"), False),
+        ("list: category", listing("category=Food"), False),
+        ("list: categories + month", listing(f"category=Food&category=Bills&month={month}"), False),
+        ("summary: day, filtered by month", summary(f"month={month}", 'day'), False),
+        ("summary: product, filtered by category", summary("category=Food", 'product'), False),
+        ("summary: product, unfiltered", summary("", 'product'), True),
+        ("dashboard", {'aggregate': MONGO_COLLECTION, 'pipeline': backend._dashboard_pipeline(month, backend.DEFAULT_PAGE_SIZE), 'cursor': {}}, False),
+        ("batch: ids", {'find': MONGO_COLLECTION, 'filter': {'_id': {'$in': [ObjectId(), ObjectId()]}}}, False),
+        ("totals: by month", {'find': MONGO_TOTALS_COLLECTION, 'filter': {'kind': MONTH, 'count': {'$gt': 0}}, 'sort': {'key': 1}}, False),
+    ]
+
+def explain_queries(database, queries):
+    # Yields (name, plan stages, flagged); flagged means an unexpected collection scan
+    for name, command, scan_expected in queries:
+        explain = database.command({'explain': command, 'verbosity': 'queryPlanner'})
+        stages = list(dict.fromkeys(_stages(explain)))
+        yield name, stages, COLLSCAN in stages and not scan_expected
+
+# --- Explain Command ---
+def main(argv):
+    from settings_config import configure_django
+    configure_django()
+    import db
+
+    command = argv[1] if len(argv) > 1 else "explain"
+    if command != "explain":
+        print("Usage: python diagnostics.py [explain]")
+        return 2
+    if not db.using_mongo():
+        print("Query plans can only be checked against MongoDB (see MONGO_URI)")
+        return 2
+
+    flagged = 0
+    for name, stages, scan in explain_queries(db.mongo_client[db.MONGO_DB], backend_queries()):
+        flagged += scan
+        print(f"{'COLLSCAN' if scan else 'ok':8} {name}: {' > '.join(stages)}")
+    print("No unexpected collection scans" if not flagged else f"{flagged} queries fall back to a collection scan")
+    return 1 if flagged else 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main(sys.argv))
@@ -0,0 +1,279 @@
+# durable_memory.py
+
+import os
+import json
+import glob
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from db import InMemoryDB, _apply_set
+
+logger = logging.getLogger(__name__)
+
+# Set to a directory to make the in-memory database survive restarts
+INMEMORY_DATA_DIR = os.environ.get("INMEMORY_DATA_DIR")
+# Log records after which a new snapshot is written, bounding how much a restart has to replay
+INMEMORY_SNAPSHOT_EVERY = int(os.environ.get("INMEMORY_SNAPSHOT_EVERY", "10000"))
+# "0" only flushes to the OS; a crash of the machine (not the process) can then lose recent writes
+INMEMORY_FSYNC = os.environ.get("INMEMORY_FSYNC", "1") != "0"
+
+SNAPSHOT_FILE = "snapshot.jsonl"
+LOG_PATTERN = "oplog.{generation:08d}.jsonl"
+
+# --- Record Encoding ---
+def _encode(value):
+    if isinstance(value, datetime):
+        # isoformat keeps microseconds and the offset, unlike BSON's millisecond dates
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Cannot persist {type(value).__name__}")
+
+def _decode(obj):
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+def _dumps(record):
+    return json.dumps(record, default=_encode, separators=(",", ":")) + "\n"
+
+# One decoder for every record; json.loads would build a new one per line
+_decoder = json.JSONDecoder(object_hook=_decode)
+
+def _loads(line):
+    return _decoder.decode(line.decode() if isinstance(line, bytes) else line)
+
+def _fsync_directory(path):
+    # Makes a rename durable; not possible (nor needed) on Windows
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+# --- Durable In-Memory Database ---
+class DurableInMemoryDB(InMemoryDB):
+    # InMemoryDB plus an append-only operation log and periodic snapshots in `data_dir`.
+    # Writes are acknowledged once their log record is on disk; concurrent writers share one fsync.
+    def __init__(self, data_dir, snapshot_every=INMEMORY_SNAPSHOT_EVERY, fsync=INMEMORY_FSYNC):
+        self.data_dir = data_dir
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self._log_file = None
+        super().__init__()
+        self._write_lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._depth = 0
+        self._written = self._synced = 0
+        self._since_snapshot = 0
+        self._snapshotting = False
+        os.makedirs(data_dir, exist_ok=True)
+        self.generation, replayed = self._recover()
+        self._log_file = open(self._log_path(self.generation), "ab")
+        if replayed >= snapshot_every:
+            self.snapshot()
+
+    def _log_path(self, generation):
+        return os.path.join(self.data_dir, LOG_PATTERN.format(generation=generation))
+
+    def _log_generations(self):
+        paths = glob.glob(os.path.join(self.data_dir, "oplog.*.jsonl"))
+        return sorted(int(os.path.basename(path).split(".")[1]) for path in paths)
+
+    # --- Recovery ---
+    def _recover(self):
+        # Latest snapshot, then every log generation written since it
+        generation = 0
+        snapshot_path = os.path.join(self.data_dir, SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, encoding="utf-8") as f:
+                header = _loads(f.readline())
+                generation, self.counter = header["generation"], header["counter"]
+                for line in f:
+                    self._restore(_loads(line))
+        generations = [g for g in self._log_generations() if g >= generation]
+        replayed = 0
+        for index, log_generation in enumerate(generations):
+            path = self._log_path(log_generation)
+            with open(path, "rb") as f:
+                lines = f.readlines()
+            offset = 0
+            for number, line in enumerate(lines):
+                try:
+                    record = _loads(line)
+                except ValueError:
+                    if index == len(generations) - 1 and number == len(lines) - 1:
+                        # A record torn by a crash mid-write was never acknowledged; cut it so appends start clean
+                        logger.warning(f"Discarding incomplete last record in {path}")
+                        with open(path, "r+b") as f:
+                            f.truncate(offset)
+                        break
+                    raise
+                self._replay(record)
+                replayed += 1
+                offset += len(line)
+        if generations:
+            generation = generations[-1]
+        # Indexes are built once over the recovered documents: a single sort instead of one insert per record
+        self._index_many(self.expenses.values())
+        logger.info(f"Recovered {len(self.expenses)} expenses from {self.data_dir} ({replayed} log records replayed)")
+        return generation, replayed
+
+    # Recovery only touches self.expenses; _recover indexes the result at the end
+    def _restore(self, doc):
+        self.expenses[doc['_id']] = doc
+        self.counter = max(self.counter, int(doc['_id']))
+
+    def _replay(self, record):
+        op = record["op"]
+        if op == "insert":
+            self._restore(record["doc"])
+        elif op == "update":
+            doc = self.expenses.get(record["_id"])
+            if doc is not None:
+                _apply_set(doc, record["update"])
+        elif op == "delete":
+            for _id in record["ids"]:
+                self.expenses.pop(_id, None)
+        elif op == "clear":
+            self.expenses = {}
+        else:
+            raise ValueError(f"Unknown log record: {op}")
+
+    # --- Logging ---
+    def _append(self, record):
+        if self._log_file is None:
+            return  # __init__ and recovery
+        self._check_open()
+        # Binary file: BufferedWriter is safe to flush from another thread while this one appends
+        self._log_file.write(_dumps(record).encode())
+        self._written += 1
+        self._since_snapshot += 1
+
+    @contextmanager
+    def _mutation(self):
+        # Applies and logs under the write lock; the outermost call then waits for its records to be durable
+        with self._write_lock:
+            # Refused before anything changes: a write that cannot be logged must not be applied either
+            self._check_open()
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                outermost, written = self._depth == 0, self._written
+                start_snapshot = outermost and self._since_snapshot >= self.snapshot_every and not self._snapshotting
+                if start_snapshot:
+                    self._snapshotting = True
+        if outermost:
+            self._sync(written)
+            if start_snapshot:
+                threading.Thread(target=self.snapshot, name="inmemory-snapshot", daemon=True).start()
+
+    def _check_open(self):
+        if self._log_file.closed:
+            raise RuntimeError(f"The operation log in {self.data_dir} has been closed")
+
+    def _sync(self, written):
+        # Group commit: whoever holds the lock flushes everything written so far, covering later arrivals too
+        with self._sync_lock:
+            if self._synced >= written:
+                return
+            target = self._written
+            self._log_file.flush()
+            if self.fsync:
+                os.fsync(self._log_file.fileno())
+            self._synced = max(self._synced, target)
+
+    # --- Hooks on InMemoryDB ---
+    def _clear(self):
+        super()._clear()
+        self._append({"op": "clear"})
+
+    def _remove(self, doc):
+        super()._remove(doc)
+        self._append({"op": "delete", "ids": [doc['_id']]})
+
+    def _update(self, doc, update_data):
+        modified = super()._update(doc, update_data)
+        self._append({"op": "update", "_id": doc['_id'], "update": update_data})
+        return modified
+
+    def insert_one(self, data):
+        with self._mutation():
+            result = super().insert_one(data)
+            self._append({"op": "insert", "doc": data})
+            return result
+
+    def insert_many(self, documents, ordered=True):
+        documents = list(documents)
+        with self._mutation():
+            result = super().insert_many(documents, ordered)
+            for data in documents:
+                self._append({"op": "insert", "doc": data})
+            return result
+
+    def delete_many(self, query=None):
+        with self._mutation():
+            return super().delete_many(query)
+
+    def delete_one(self, query):
+        with self._mutation():
+            return super().delete_one(query)
+
+    def update_one(self, query, update_data):
+        with self._mutation():
+            return super().update_one(query, update_data)
+
+    def find_one_and_update(self, query, update_data, return_document=False):
+        with self._mutation():
+            return super().find_one_and_update(query, update_data, return_document)
+
+    def find_one_and_delete(self, query):
+        with self._mutation():
+            return super().find_one_and_delete(query)
+
+    # --- Snapshots ---
+    def snapshot(self):
+        # Copies the state and starts a new log generation under the write lock; the file is written outside it
+        with self._write_lock:
+            with self._sync_lock:
+                if self._log_file.closed:
+                    self._snapshotting = False
+                    return
+                self._log_file.flush()
+                if self.fsync:
+                    os.fsync(self._log_file.fileno())
+                self._synced = self._written
+                self._log_file.close()
+                self.generation += 1
+                self._log_file = open(self._log_path(self.generation), "ab")
+            generation, counter = self.generation, self.counter
+            docs = [dict(doc) for doc in self.expenses.values()]
+            self._since_snapshot = 0
+        try:
+            path = os.path.join(self.data_dir, SNAPSHOT_FILE)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(_dumps({"generation": generation, "counter": counter}))
+                for doc in docs:
+                    f.write(_dumps(doc))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            _fsync_directory(self.data_dir)
+            # Older generations are fully contained in the snapshot now
+            for old in self._log_generations():
+                if old < generation:
+                    os.remove(self._log_path(old))
+            logger.info(f"Snapshot of {len(docs)} expenses written (log generation {generation})")
+        finally:
+            self._snapshotting = False
+
+    def close(self):
+        with self._write_lock, self._sync_lock:
+            if self._log_file is not None and not self._log_file.closed:
+                self._log_file.flush()
+                if self.fsync:
+                    os.fsync(self._log_file.fileno())
+                self._log_file.close()
@@ -1,19 +1,114 @@
 import streamlit as st
-import requests
 from datetime import datetime
-from requests.exceptions import ConnectionError
-import pandas as pd
-import plotly.express as px
+from requests.exceptions import ConnectionError, RequestException
+from api_client import BACKEND_URL, EXPENSE_COLUMNS, ExpenseClient
 
-BACKEND_URL = "http://localhost:8000"
+# Seconds a cached read may be reused before it is fetched again (other users' changes)
+READ_CACHE_TTL = 30
+# Rows shown at once in the "Manage Expense" editor
+MANAGE_PAGE_SIZE = 50
+CATEGORIES = ["Food", "Travel", "Bills", "Shopping", "Others"]
+
+# --- Backend client shared by every session of this Streamlit server ---
+@st.cache_resource
+def get_client():
+    return ExpenseClient(BACKEND_URL)
 
 # --- Check backend availability ---
 def check_backend_connection():
-    try:
-        response = requests.get(f"{BACKEND_URL}/api/expenses/")
-        return response.status_code == 200
-    except ConnectionError:
-        return False
+    return get_client().is_alive()
+
+# --- Cached reads (cleared after this app's own writes) ---
+@st.cache_data(ttl=READ_CACHE_TTL, show_spinner=False)
+def load_dashboard(month=None):
+    return get_client().dashboard(month)
+
+@st.cache_data(ttl=READ_CACHE_TTL, show_spinner=False)
+def load_remaining_expenses(month, cursor):
+    return get_client().expenses_frame(cursor, month=month)
+
+# --- Raw listing columns -> display frame, without per-row Python ---
+def to_display_frame(raw, time_zone):
+    # pandas and plotly are imported where data is rendered, so the connection-error page starts without them
+    import pandas as pd
+    dates = raw["date"]
+    if not isinstance(dates.dtype, pd.DatetimeTZDtype):
+        dates = pd.to_datetime(dates, utc=True, format="ISO8601")
+    dates = dates.dt.tz_convert(time_zone)
+    return pd.DataFrame({
+        "_id": raw["_id"].astype(str),
+        "Date": dates.dt.strftime("%Y-%m-%d"),
+        "Month-Year": dates.dt.strftime("%B-%Y"),
+        "Product": raw["product_name"].fillna("Unknown"),
+        "Category": raw["category"].fillna("Others"),
+        "Amount": raw["amount"].astype(float),
+    })
+
+@st.cache_data(ttl=READ_CACHE_TTL, show_spinner=False)
+def load_manage_page(month, cursor):
+    return get_client().expenses_page(cursor, month=month, page_size=MANAGE_PAGE_SIZE)
+
+def invalidate_reads():
+    load_dashboard.clear()
+    load_remaining_expenses.clear()
+    load_manage_page.clear()
+
+# --- Paged "Manage Expense" editor: one page of rows, batched writes ---
+def render_manage_editor(month, time_zone):
+    # Stack of cursors per month; the last one is the page on screen
+    cursors = st.session_state.setdefault("manage_cursors", {}).setdefault(month, [None])
+    import pandas as pd
+    page = load_manage_page(month, cursors[-1])
+    raw = pd.DataFrame.from_records(page["results"], columns=EXPENSE_COLUMNS)
+    view = to_display_frame(raw, time_zone).set_index("_id")[["Date", "Product", "Category", "Amount"]]
+    view.insert(0, "Select", False)
+
+    edited = st.data_editor(
+        view,
+        key=f"manage_{month}_{len(cursors)}",
+        hide_index=True,
+        disabled=["Date"],
+        column_config={
+            "Select": st.column_config.CheckboxColumn("Select"),
+            "Category": st.column_config.SelectboxColumn("Category", options=CATEGORIES, required=True),
+            "Amount": st.column_config.NumberColumn("Amount (₹)", min_value=0.01, step=0.01, format="%.2f"),
+        },
+        use_container_width=True,
+    )
+    selected = edited.index[edited["Select"]].tolist()
+    fields = ["Product", "Category", "Amount"]
+    changed = edited[fields].ne(view[fields]).any(axis=1)
+    updates = [
+        {"_id": expense_id, "product_name": row["Product"], "category": row["Category"], "amount": float(row["Amount"])}
+        for expense_id, row in edited.loc[changed, fields].iterrows()
+    ]
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+    if col1.button("⬅️ Previous", disabled=len(cursors) == 1, key=f"prev_{month}"):
+        cursors.pop()
+        st.rerun()
+    if col2.button("Next ➡️", disabled=not page["next_cursor"], key=f"next_{month}"):
+        cursors.append(page["next_cursor"])
+        st.rerun()
+    if col3.button("✏️ Edit selected", disabled=len(selected) != 1, key=f"edit_{month}"):
+        row = edited.loc[selected[0]]
+        st.session_state.edit_mode = True
+        st.session_state.edit_id = selected[0]
+        st.session_state.edit_data = {"product_name": row["Product"], "amount": float(row["Amount"]), "category": row["Category"] if row["Category"] in CATEGORIES else "Others"}
+        st.rerun()
+    if col4.button(f"💾 Save changes ({len(updates)})", disabled=not updates, key=f"save_{month}"):
+        response = get_client().update_expenses(updates)
+        invalidate_reads()
+        if response.status_code == 200 and not response.json()["errors"]:
+            st.rerun()
+        st.error(f"❌ Some changes were not saved: {response.text}")
+    if col5.button(f"🗑️ Delete selected ({len(selected)})", disabled=not selected, key=f"delete_{month}"):
+        response = get_client().delete_expenses(selected)
+        invalidate_reads()
+        if response.status_code == 200:
+            st.session_state.manage_cursors[month] = [None]
+            st.rerun()
+        st.error("❌ Deletion failed")
 
 # --- Run App ---
 def run_streamlit_app():
@@ -75,7 +170,8 @@ def run_streamlit_app():
 
         if st.button("🗑️ Reset All Expenses"):
             try:
-                response = requests.delete(f"{BACKEND_URL}/api/expenses/reset/")
+                response = get_client().reset_expenses()
+                invalidate_reads()
                 if response.status_code == 200:
                     st.success("🧹 All expenses have been reset!")
                 else:
@@ -112,16 +208,18 @@ def run_streamlit_app():
 
                 try:
                     if st.session_state.edit_mode:
-                        response = requests.put(f"{BACKEND_URL}/api/expenses/{st.session_state.edit_id}/update/", json=expense_data)
+                        response = get_client().update_expense(st.session_state.edit_id, expense_data)
+                        invalidate_reads()
                         if response.status_code == 200:
                             st.success("✅ Expense updated successfully!")
                             st.session_state.edit_mode = False
                             st.session_state.edit_data = {}
-                            st.experimental_rerun()
+                            st.rerun()
                         else:
                             st.error("❌ Failed to update expense")
                     else:
-                        response = requests.post(f"{BACKEND_URL}/api/expenses/add/", json=expense_data)
+                        response = get_client().add_expense(expense_data)
+                        invalidate_reads()
                         if response.status_code == 201:
                             st.success(f"✅ Added: {product_name} - ₹{amount:.2f} ({category})")
                         else:
@@ -134,92 +232,64 @@ def run_streamlit_app():
     # ------------------- Expense Summary & Visualizations -------------------
     st.subheader("📊 Expense Summary")
     try:
-        total_response = requests.get(f"{BACKEND_URL}/api/expenses/total/")
-        if total_response.status_code == 200:
-            total_expenses = total_response.json().get("total", 0)
-            remaining_budget = st.session_state.budget - total_expenses
-
-            col1, col2, col3 = st.columns(3)
-            col1.metric("💰 Total Budget", f"₹{st.session_state.budget:.2f}")
-            col2.metric("💸 Total Expenses", f"₹{total_expenses:.2f}")
-            col3.metric("📉 Remaining Budget", f"₹{remaining_budget:.2f}", delta=f"-₹{total_expenses:.2f}")
-
-            expenses_response = requests.get(f"{BACKEND_URL}/api/expenses/")
-            if expenses_response.status_code == 200:
-                expenses = expenses_response.json()
-                if expenses:
-                    expense_data = []
-                    for expense in expenses:
-                        try:
-                            date = datetime.fromisoformat(expense["date"].replace("Z", "+00:00"))
-                        except Exception:
-                            date = datetime.now()
-                        expense_data.append({
-                            "_id": expense.get("_id", ""),
-                            "Date": date.strftime("%Y-%m-%d"),
-                            "Month-Year": date.strftime("%B-%Y"),
-                            "Product": expense.get("product_name", "Unknown"),
-                            "Category": expense.get("category", "Others"),
-                            "Amount": expense.get("amount", 0.0)
-                        })
-
-                    df = pd.DataFrame(expense_data)
-                    df["Amount"] = df["Amount"].astype(float)
-
-                    unique_months = df["Month-Year"].unique()
-                    selected_month = st.selectbox("📅 Select Month", options=unique_months)
-
-                    filtered_df = df[df["Month-Year"] == selected_month]
-
-                    if not filtered_df.empty:
-                        st.dataframe(filtered_df.drop(columns=["_id"]), use_container_width=True)
-
-                        # -- Edit/Delete --
-                        with st.expander("🗑️ Manage Expense"):
-                            for i, row in filtered_df.iterrows():
-                                col1, col2 = st.columns([4, 1])
-                                with col1:
-                                    st.write(f"{row['Product']} - ₹{row['Amount']} ({row['Category']})")
-                                with col2:
-                                    if st.button("Edit", key=f"edit_{i}"):
-                                        st.session_state.edit_mode = True
-                                        st.session_state.edit_id = row["_id"]
-                                        st.session_state.edit_data = row.to_dict()
-                                        st.experimental_rerun()
-                                    if st.button("Delete", key=f"delete_{i}"):
-                                        try:
-                                            delete_response = requests.delete(f"{BACKEND_URL}/api/expenses/{row['_id']}/delete/")
-                                            if delete_response.status_code == 200:
-                                                st.success("✅ Deleted!")
-                                                st.experimental_rerun()
-                                            else:
-                                                st.error("❌ Deletion failed")
-                                        except Exception as e:
-                                            st.error(f"❌ Error: {e}")
-
-                        # Charts
-                        st.subheader("📈 Visualizations")
-                        chart1, chart2, chart3 = st.columns(3)
-                        with chart1:
-                            st.caption("Line Chart")
-                            st.line_chart(data=filtered_df, x="Date", y="Amount", use_container_width=True)
-                        with chart2:
-                            fig_bar = px.bar(filtered_df, x="Product", y="Amount", color="Product")
-                            st.plotly_chart(fig_bar, use_container_width=True)
-                        with chart3:
-                            fig_pie = px.pie(filtered_df, names="Category", values="Amount", hole=0.3)
-                            st.plotly_chart(fig_pie, use_container_width=True)
+        dashboard = load_dashboard(st.session_state.get("selected_month"))
+        month_keys = [row["key"] for row in dashboard["months"]]
+        total_expenses = dashboard["total"]
+        remaining_budget = st.session_state.budget - total_expenses
+
+        col1, col2, col3 = st.columns(3)
+        col1.metric("💰 Total Budget", f"₹{st.session_state.budget:.2f}")
+        col2.metric("💸 Total Expenses", f"₹{total_expenses:.2f}")
+        col3.metric("📉 Remaining Budget", f"₹{remaining_budget:.2f}", delta=f"-₹{total_expenses:.2f}")
+
+        if month_keys:
+            current = month_keys.index(dashboard["month"]) if dashboard["month"] in month_keys else len(month_keys) - 1
+            selected_month = st.selectbox("📅 Select Month", options=month_keys, index=current, format_func=lambda key: datetime.strptime(key, "%Y-%m").strftime("%B-%Y"))
+            if selected_month != dashboard["month"]:
+                st.session_state.selected_month = selected_month
+                dashboard = load_dashboard(selected_month)
+
+            import pandas as pd
+            time_zone = dashboard["time_zone"]
+            filtered_df = to_display_frame(pd.DataFrame.from_records(dashboard["expenses"]["results"], columns=EXPENSE_COLUMNS), time_zone)
+            if dashboard["expenses"]["next_cursor"]:
+                remaining = load_remaining_expenses(selected_month, dashboard["expenses"]["next_cursor"])
+                filtered_df = pd.concat([filtered_df, to_display_frame(remaining, time_zone)], ignore_index=True)
+
+            if not filtered_df.empty:
+                st.dataframe(filtered_df.drop(columns=["_id"]), use_container_width=True)
+
+                # -- Edit/Delete --
+                with st.expander("🗑️ Manage Expense"):
+                    render_manage_editor(selected_month, time_zone)
+
+                # Charts
+                import plotly.express as px
+                products_df = pd.DataFrame(dashboard["products"], columns=["key", "total", "count"])
+                categories_df = pd.DataFrame(dashboard["categories"], columns=["key", "total", "count"])
+                products_df = products_df.rename(columns={"key": "Product", "total": "Amount"})
+                categories_df = categories_df.rename(columns={"key": "Category", "total": "Amount"})
+
+                st.subheader("📈 Visualizations")
+                chart1, chart2, chart3 = st.columns(3)
+                with chart1:
+                    st.caption("Line Chart")
+                    st.line_chart(data=filtered_df, x="Date", y="Amount", use_container_width=True)
+                with chart2:
+                    fig_bar = px.bar(products_df, x="Product", y="Amount", color="Product")
+                    st.plotly_chart(fig_bar, use_container_width=True)
+                with chart3:
+                    fig_pie = px.pie(categories_df, names="Category", values="Amount", hole=0.3)
+                    st.plotly_chart(fig_pie, use_container_width=True)
 
-                    else:
-                        st.info("ℹ️ No expenses for selected month.")
-                else:
-                    st.info("ℹ️ No data available.")
             else:
-                st.error("❌ Failed to fetch expenses")
+                st.info("ℹ️ No expenses for selected month.")
         else:
-            st.error("❌ Failed to calculate total expenses")
+            st.info("ℹ️ No data available.")
     except ConnectionError:
         st.error("❌ Could not connect to the backend server")
+    except RequestException:
+        st.error("❌ Failed to load the expense summary")
 
 if __name__ == "__main__":
     run_streamlit_app()
@@ -0,0 +1,280 @@
+# metrics.py
+
+import os
+import time
+import bisect
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("slow_queries")
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Upper bounds in seconds, from sub-millisecond in-memory reads to multi-second scans
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Database calls at least this slow are logged to the "slow_queries" logger; 0 disables the log
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "0"))
+SLOW_QUERY_MAX_CHARS = 500
+
+# --- Metric Types ---
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def lines(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames, self.buckets = name, help, tuple(labelnames), tuple(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, *labels):
+        entry = self._values.get(labels)
+        return entry[2] if entry else 0
+
+    def lines(self):
+        with self._lock:
+            values = sorted((labels, (list(counts), total, count)) for labels, (counts, total, count) in self._values.items())
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', bound)])} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        # Prometheus text exposition format
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.lines())
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        for metric in self.metrics:
+            metric.clear()
+
+registry = MetricsRegistry()
+
+http_requests = registry.register(Counter(
+    "expense_tracker_http_requests_total", "HTTP requests by view, method and status code", ("view", "method", "status")))
+http_request_seconds = registry.register(Histogram(
+    "expense_tracker_http_request_duration_seconds", "Time spent in the view, serialization included", ("view", "method")))
+http_request_db_seconds = registry.register(Histogram(
+    "expense_tracker_http_request_db_seconds", "Part of each request spent waiting for the database", ("view", "method")))
+db_operations = registry.register(Counter(
+    "expense_tracker_db_operations_total", "Database calls by collection and operation", ("collection", "operation")))
+db_operation_seconds = registry.register(Histogram(
+    "expense_tracker_db_operation_duration_seconds", "Database call latency", ("collection", "operation")))
+db_documents_returned = registry.register(Counter(
+    "expense_tracker_db_documents_returned_total", "Documents returned by database reads", ("collection", "operation")))
+db_slow_queries = registry.register(Counter(
+    "expense_tracker_db_slow_queries_total", "Database calls slower than SLOW_QUERY_MS", ("collection", "operation")))
+
+# --- Database Timing ---
+# Database seconds accumulated by the request being handled; None outside a request
+_request_db_seconds = contextvars.ContextVar("request_db_seconds", default=None)
+
+class _Operation:
+    documents = 0
+
+def _describe(args):
+    text = ", ".join(repr(arg) for arg in args)
+    return text if len(text) <= SLOW_QUERY_MAX_CHARS else text[:SLOW_QUERY_MAX_CHARS] + "..."
+
+@contextmanager
+def db_operation(collection, operation, args=()):
+    # Times one database call; set `.documents` on the yielded object for reads
+    op = _Operation()
+    started = time.perf_counter()
+    try:
+        yield op
+    finally:
+        elapsed = time.perf_counter() - started
+        db_operations.inc(collection, operation)
+        db_operation_seconds.observe(elapsed, collection, operation)
+        if op.documents:
+            db_documents_returned.inc(collection, operation, amount=op.documents)
+        accumulated = _request_db_seconds.get()
+        if accumulated is not None:
+            accumulated[0] += elapsed
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+            db_slow_queries.inc(collection, operation)
+            slow_query_logger.warning(f"{collection}.{operation} took {elapsed * 1000:.1f} ms: {_describe(args)}")
+
+def _returned(result):
+    if isinstance(result, list):
+        return len(result)
+    return int(result is not None)
+
+class InstrumentedCollection:
+    # Wraps a collection (pymongo, InMemoryDB or SQLiteDB); other attributes pass through untouched
+    OPERATIONS = ('insert_one', 'insert_many', 'find', 'find_one', 'aggregate', 'update_one', 'delete_one',
+                  'delete_many', 'find_one_and_update', 'find_one_and_delete', 'bulk_write')
+    READS = ('find', 'find_one', 'aggregate', 'find_one_and_update', 'find_one_and_delete')
+
+    def __init__(self, collection, name):
+        self._collection = collection
+        self._name = name
+
+    def __getattr__(self, attr):
+        target = getattr(self._collection, attr)
+        if attr not in self.OPERATIONS:
+            return target
+
+        @wraps(target)
+        def timed(*args, **kwargs):
+            with db_operation(self._name, attr, args) as op:
+                result = target(*args, **kwargs)
+                if attr in ('find', 'aggregate'):
+                    # pymongo cursors are lazy; reading them here is what makes the timing meaningful
+                    result = list(result)
+                if attr in self.READS:
+                    op.documents = _returned(result)
+            return result
+        # Cached on the instance so later calls skip __getattr__
+        setattr(self, attr, timed)
+        return timed
+
+    def __repr__(self):
+        return f"<instrumented {self._collection!r}>"
+
+# --- Async Database Timing (ASGI production mode) ---
+class _TimedAsyncCursor:
+    def __init__(self, cursor, collection, operation, args):
+        self._cursor, self._collection, self._operation, self._args = cursor, collection, operation, args
+
+    async def to_list(self, *args, **kwargs):
+        with db_operation(self._collection, self._operation, self._args) as op:
+            documents = await self._cursor.to_list(*args, **kwargs)
+            op.documents = len(documents)
+        return documents
+
+class InstrumentedAsyncCollection:
+    def __init__(self, collection, name):
+        self._collection = collection
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._collection, attr)
+
+    def find(self, *args, **kwargs):
+        # The query runs when the cursor is read, so that is what gets timed
+        return _TimedAsyncCursor(self._collection.find(*args, **kwargs), self._name, 'find', args)
+
+    async def find_one(self, *args, **kwargs):
+        with db_operation(self._name, 'find_one', args) as op:
+            document = await self._collection.find_one(*args, **kwargs)
+            op.documents = _returned(document)
+        return document
+
+    async def aggregate(self, *args, **kwargs):
+        return _TimedAsyncCursor(await self._collection.aggregate(*args, **kwargs), self._name, 'aggregate', args)
+
+class InstrumentedAsyncDatabase:
+    def __init__(self, database):
+        self._database = database
+
+    def __getitem__(self, name):
+        return InstrumentedAsyncCollection(self._database[name], name)
+
+    def __getattr__(self, attr):
+        return getattr(self._database, attr)
+
+# --- Request Timing Middleware ---
+class MetricsMiddleware:
+    # Times every request per URL name, with the share spent in the database
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token, started = _request_db_seconds.set([0.0]), time.perf_counter()
+        try:
+            response = self.get_response(request)
+            self._record(request, response, started)
+            return response
+        finally:
+            _request_db_seconds.reset(token)
+
+    async def __acall__(self, request):
+        token, started = _request_db_seconds.set([0.0]), time.perf_counter()
+        try:
+            response = await self.get_response(request)
+            self._record(request, response, started)
+            return response
+        finally:
+            _request_db_seconds.reset(token)
+
+    def _record(self, request, response, started):
+        elapsed = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        # URL names rather than paths, so /api/expenses/<id>/... does not create a series per id
+        view = match.url_name if match is not None and match.url_name else "unmatched"
+        http_requests.inc(view, request.method, str(response.status_code))
+        http_request_seconds.observe(elapsed, view, request.method)
+        http_request_db_seconds.observe(_request_db_seconds.get()[0], view, request.method)
@@ -0,0 +1,55 @@
+# renderers.py
+
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow output is optional; JSON is always available
+    pa = None
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+def expense_schema(next_cursor=None):
+    metadata = {"next_cursor": next_cursor} if next_cursor else None
+    return pa.schema([
+        ("_id", pa.string()),
+        ("product_name", pa.string()),
+        ("amount", pa.float64()),
+        ("category", pa.string()),
+        # Epoch milliseconds; the time zone only tells readers how to display them
+        ("date", pa.timestamp("ms", tz=settings.TIME_ZONE)),
+    ], metadata=metadata)
+
+def expense_table(expenses, next_cursor=None):
+    schema = expense_schema(next_cursor)
+    columns = [[expense.get(field.name) for expense in expenses] for field in schema]
+    return pa.Table.from_arrays([pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema)
+
+# --- Columnar Listing Renderer ---
+class ArrowRenderer(BaseRenderer):
+    # Renders a {"results", "next_cursor"} page as one Arrow IPC stream; the cursor travels in the schema metadata
+    media_type = ARROW_MEDIA_TYPE
+    format = "arrow"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, dict) or "results" not in data:
+            # Errors keep their JSON body so clients can still read them
+            response = (renderer_context or {}).get("response")
+            if response is not None:
+                response["Content-Type"] = JSONRenderer.media_type
+            return JSONRenderer().render(data, accepted_media_type, renderer_context)
+        table = expense_table(data["results"], data.get("next_cursor"))
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+def listing_renderers():
+    from rest_framework.settings import api_settings
+    renderers = list(api_settings.DEFAULT_RENDERER_CLASSES)
+    if pa is not None:
+        renderers.append(ArrowRenderer)
+    return renderers
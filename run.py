@@ -1,8 +1,16 @@
 # run.py
 
+import sys
+import argparse
 import threading
+import subprocess
 import time
 import logging
+import requests
+
+# Cold start is measured from here: imports, Django setup and the backend coming up
+LAUNCHED_AT = time.perf_counter()
+
 from settings_config import configure_django
 
 # FIRST: Configure Django settings properly
@@ -16,13 +24,45 @@ from frontend import run_streamlit_app
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+HEALTH_URL = "http://localhost:8000/api/health/"
+READY_TIMEOUT = 30  # seconds
+READY_POLL_INTERVAL = 0.05
+
+# --- Wait for the backend instead of a fixed sleep ---
+def wait_until_ready(url=HEALTH_URL, timeout=READY_TIMEOUT, interval=READY_POLL_INTERVAL):
+    # Returns the seconds it took the health check to answer 200, or None on timeout
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return time.perf_counter() - started
+        except requests.RequestException:
+            pass
+        time.sleep(interval)
+    return None
+
 if __name__ == "__main__":
-    # Start Django server
-    django_thread = threading.Thread(target=run_django_server, daemon=True)
-    django_thread.start()
+    parser = argparse.ArgumentParser(description="Launch the Expense Tracker backend and frontend")
+    parser.add_argument("--production", action="store_true", help="serve the API with the multi-worker ASGI server (serve.py)")
+    parser.add_argument("--workers", type=int, default=None, help="ASGI worker processes in --production mode")
+    args = parser.parse_args()
+
+    if args.production:
+        # Separate processes, so the API no longer shares a GIL with Streamlit
+        command = [sys.executable, "serve.py"] + (["--workers", str(args.workers)] if args.workers else [])
+        subprocess.Popen(command)
+        logger.info("Starting ASGI server...")
+    else:
+        # Start Django server
+        django_thread = threading.Thread(target=run_django_server, daemon=True)
+        django_thread.start()
+        logger.info("Starting Django server...")
 
-    logger.info("Starting Django server...")
-    time.sleep(2)
+    elapsed = wait_until_ready()
+    if elapsed is None:
+        logger.warning(f"Backend did not answer {HEALTH_URL} within {READY_TIMEOUT}s, starting Streamlit anyway")
+    else:
+        logger.info(f"Backend ready in {elapsed * 1000:.0f} ms ({(time.perf_counter() - LAUNCHED_AT) * 1000:.0f} ms since launch)")
 
     logger.info("Starting Streamlit app...")
     run_streamlit_app()
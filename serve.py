@@ -0,0 +1,41 @@
+# serve.py
+
+import os
+import sys
+import logging
+import argparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 8000
+
+def default_workers():
+    # WEB_CONCURRENCY is the conventional override used by most hosting platforms
+    return int(os.environ.get("WEB_CONCURRENCY") or os.cpu_count() or 1)
+
+# --- Production ASGI Server ---
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None):
+    os.environ["EXPENSE_TRACKER_ENV"] = "production"
+    import uvicorn
+    from db import using_mongo
+
+    workers = workers or default_workers()
+    if workers > 1 and not using_mongo():
+        logger.warning("Only MongoDB storage is shared between workers, using 1 worker")
+        workers = 1
+    logger.info(f"Serving backend:asgi_application on {host}:{port} with {workers} worker(s)")
+    # Django has no lifespan support, so uvicorn should not probe for it
+    uvicorn.run("backend:asgi_application", host=host, port=port, workers=workers, lifespan="off")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Expense Tracker API under a multi-worker ASGI server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: $WEB_CONCURRENCY or CPU count)")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.workers)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main(sys.argv[1:])
@@ -4,18 +4,24 @@ import os
 from django.conf import settings
 from django.utils.crypto import get_random_string
 
+# `python serve.py` sets this to run the multi-worker ASGI server
+PRODUCTION = os.environ.get("EXPENSE_TRACKER_ENV") == "production"
+
+# The only place Django is configured; run.py, backend.py, serve.py and the totals CLI all call this
 def configure_django():
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "expense_tracker.settings")
     
     if not settings.configured:
         settings.configure(
-            DEBUG=True,
+            DEBUG=not PRODUCTION,
             SECRET_KEY=get_random_string(50),
             ROOT_URLCONF="backend",
             ALLOWED_HOSTS=['*'],
             MIDDLEWARE=[
-                'django.middleware.security.SecurityMiddleware',
+                'metrics.MetricsMiddleware',
+                'corsheaders.middleware.CorsMiddleware',
                 'django.middleware.common.CommonMiddleware',
+                'django.middleware.security.SecurityMiddleware',
                 'django.middleware.csrf.CsrfViewMiddleware',
                 'django.middleware.clickjacking.XFrameOptionsMiddleware',
             ],
@@ -23,6 +29,7 @@ def configure_django():
                 'django.contrib.contenttypes',
                 'django.contrib.auth',
                 'rest_framework',
+                'corsheaders',
             ],
             DATABASES={
                 'default': {
@@ -38,6 +45,7 @@ def configure_django():
                 'BACKEND': 'django.template.backends.django.DjangoTemplates',
                 'APP_DIRS': True,
             }],
+            CORS_ALLOW_ALL_ORIGINS=True,
         )
 
     import django
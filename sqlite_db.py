@@ -0,0 +1,389 @@
+# sqlite_db.py
+
+import os
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+from db import _EPOCH, _date_key, _date_to_string, _is_operator_dict, _project, _run_pipeline
+from totals import OVERALL, MONTH, CATEGORY
+
+logger = logging.getLogger(__name__)
+
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "expense_tracker.sqlite3")
+SQLITE_TABLE = "expenses"
+SQLITE_META_TABLE = "expense_meta"
+SQLITE_TOTALS_TABLE = "expense_totals"
+# Milliseconds a writer waits for another connection's transaction before failing
+SQLITE_BUSY_TIMEOUT_MS = 5000
+
+# Document field -> column; `_id` is the integer rowid exposed as a string, like InMemoryDB ids
+COLUMNS = {'_id': 'id', 'product_name': 'product_name', 'amount': 'amount', 'category': 'category', 'date': 'date'}
+FIELDS = [field for field in COLUMNS if field != '_id']
+
+SCHEMA = [
+    f"""CREATE TABLE IF NOT EXISTS {SQLITE_TABLE} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_name TEXT,
+        amount REAL,
+        category TEXT,
+        date INTEGER,
+        local_date TEXT
+    )""",
+    f"CREATE TABLE IF NOT EXISTS {SQLITE_META_TABLE} (key TEXT PRIMARY KEY, value TEXT)",
+    # Running totals (see totals.SQLiteTotals); the overall row's key is '' because NULLs never match in a primary key
+    f"""CREATE TABLE IF NOT EXISTS {SQLITE_TOTALS_TABLE} (
+        kind TEXT NOT NULL, key TEXT NOT NULL, total REAL NOT NULL, count INTEGER NOT NULL,
+        PRIMARY KEY (kind, key)
+    )""",
+    # (date, id) serves the keyset listing and month ranges; (category, date) the category filters
+    f"CREATE INDEX IF NOT EXISTS {SQLITE_TABLE}_date ON {SQLITE_TABLE} (date, id)",
+    f"CREATE INDEX IF NOT EXISTS {SQLITE_TABLE}_category_date ON {SQLITE_TABLE} (category, date)",
+]
+
+# Running totals kinds -> key expression over the expenses table; rows with a NULL key are not counted
+TOTALS_KEYS = {OVERALL: "''", MONTH: "substr(local_date, 1, 7)", CATEGORY: "category"}
+
+# $dateToString formats answered from the stored local_date column ('YYYY-MM-DD' in the database's time zone)
+LOCAL_DATE_FORMATS = {'%Y-%m': "substr(local_date, 1, 7)", '%Y-%m-%d': "local_date"}
+
+_OPERATORS = {'$eq': '=', '$ne': '!=', '$gt': '>', '$gte': '>=', '$lt': '<', '$lte': '<='}
+_SELECT = f"SELECT id, product_name, amount, category, date FROM {SQLITE_TABLE}"
+
+class _Unsupported(Exception):
+    # Raised while translating a pipeline stage SQL cannot express; that stage then runs in Python
+    pass
+
+# --- Value Conversion ---
+def _to_row_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_sql(field, value):
+    if field == '_id':
+        return _to_row_id(value)
+    if field == 'date':
+        return _date_key(value)
+    return value
+
+def _from_date(value):
+    return _EPOCH + timedelta(microseconds=value) if value is not None else None
+
+def _local_date(value, time_zone):
+    # Calendar day of a stored date key in `time_zone`, kept so month/day summaries are plain SQL
+    return _from_date(value).astimezone(ZoneInfo(time_zone)).strftime('%Y-%m-%d') if value is not None else None
+
+def _default_time_zone():
+    from django.conf import settings
+    return settings.TIME_ZONE if settings.configured else 'UTC'
+
+def _to_doc(row):
+    doc = {'_id': str(row[0])}
+    for field, value in zip(FIELDS, row[1:]):
+        # SQL cannot tell a missing field from a null one; both come back as None
+        doc[field] = _from_date(value) if field == 'date' else value
+    return doc
+
+def _column(field):
+    if field not in COLUMNS:
+        raise ValueError(f"Unsupported field: {field}")
+    return COLUMNS[field]
+
+# --- Query Translation (same subset InMemoryDB understands) ---
+def _condition(field, op, arg):
+    column = _column(field)
+    if op in ('$in', '$nin'):
+        values = [_to_sql(field, value) for value in arg]
+        known = [value for value in values if value is not None]
+        sql = f"{column} IN ({', '.join('?' * len(known))})" if known else "0"
+        if None in values or None in arg:
+            sql = f"({sql} OR {column} IS NULL)"
+        return (f"NOT {sql}" if op == '$nin' else sql), known
+    if op not in _OPERATORS:
+        raise ValueError(f"Unsupported query operator: {op}")
+    value = _to_sql(field, arg)
+    if arg is None:
+        return (f"{column} IS NULL" if op == '$eq' else f"{column} IS NOT NULL" if op == '$ne' else "0"), []
+    if value is None:
+        # An id that can never exist, e.g. a Mongo ObjectId string
+        return ("1" if op == '$ne' else "0"), []
+    if op == '$ne':
+        # Like MongoDB, $ne also matches documents missing the field
+        return f"({column} IS NULL OR {column} != ?)", [value]
+    return f"{column} {_OPERATORS[op]} ?", [value]
+
+def _where(query):
+    clauses, params = [], []
+    for key, condition in (query or {}).items():
+        if key in ('$and', '$or'):
+            parts = [_where(sub) for sub in condition]
+            joiner = ' AND ' if key == '$and' else ' OR '
+            clauses.append(f"({joiner.join(sql for sql, _ in parts) or ('1' if key == '$and' else '0')})")
+            params.extend(param for _, sub_params in parts for param in sub_params)
+            continue
+        conditions = condition.items() if _is_operator_dict(condition) else [('$eq', condition)]
+        for op, arg in conditions:
+            sql, sql_params = _condition(key, op, arg)
+            clauses.append(sql)
+            params.extend(sql_params)
+    return ' AND '.join(clauses) or '1', params
+
+def _order_by(sort):
+    return ', '.join(f"{_column(field)} {'DESC' if direction < 0 else 'ASC'}" for field, direction in sort or [])
+
+# --- Aggregation Pushdown ---
+def _group_key(expression, time_zone):
+    # SQL for a $group _id, and how to turn its value back into a document value
+    if expression is None:
+        return "NULL", lambda value: None, []
+    if isinstance(expression, str) and expression.startswith('$'):
+        field = expression[1:]
+        return _column(field), (_from_date if field == 'date' else lambda value: value), []
+    if isinstance(expression, dict) and set(expression) == {'$dateToString'}:
+        spec = expression['$dateToString']
+        if spec.get('date') != '$date' or set(spec) - {'format', 'date', 'timezone'}:
+            raise _Unsupported()
+        if spec.get('timezone', 'UTC') == time_zone and spec['format'] in LOCAL_DATE_FORMATS:
+            return LOCAL_DATE_FORMATS[spec['format']], lambda value: value, []
+        # Any other zone or format is computed per row by the Python function
+        return "date_to_string(date, ?, ?)", lambda value: value, [spec['format'], spec.get('timezone', 'UTC')]
+    raise _Unsupported()
+
+def _accumulator(accumulator):
+    (op, expression), = accumulator.items()
+    if op == '$sum' and isinstance(expression, (int, float)) and not isinstance(expression, bool):
+        return f"COUNT(*) * {expression!r}" if expression != 1 else "COUNT(*)", lambda value: value
+    if not (isinstance(expression, str) and expression.startswith('$')):
+        raise _Unsupported()
+    field = expression[1:]
+    column = _column(field)
+    convert = _from_date if field == 'date' else lambda value: value
+    if op == '$sum':
+        # TOTAL() is 0.0 over no rows, like MongoDB's $sum
+        if field == 'date':
+            raise _Unsupported()
+        return f"TOTAL({column})", lambda value: value
+    if op in ('$avg', '$min', '$max'):
+        return f"{op[1:].upper()}({column})", (lambda value: value) if op == '$avg' else convert
+    raise _Unsupported()
+
+def _date_to_string_sql(value, fmt, time_zone):
+    return _date_to_string(_from_date(value), {'format': fmt, 'timezone': time_zone}) if value is not None else None
+
+# --- SQLite Database (durable single-node storage) ---
+class SQLiteDB:
+    def __init__(self, path=SQLITE_PATH, time_zone=None):
+        self.path = path
+        self.time_zone = time_zone or _default_time_zone()
+        # sqlite3 connections are not shareable between threads; each thread gets its own
+        self._local = threading.local()
+        with self._transaction() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._migrate(conn)
+
+    def _migrate(self, conn):
+        # Files from before local_date, or written under another time zone, get the column (re)filled once
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({SQLITE_TABLE})")}
+        if 'local_date' not in columns:
+            conn.execute(f"ALTER TABLE {SQLITE_TABLE} ADD COLUMN local_date TEXT")
+        stored = conn.execute(f"SELECT value FROM {SQLITE_META_TABLE} WHERE key = 'time_zone'").fetchone()
+        if stored is None or stored[0] != self.time_zone or 'local_date' not in columns:
+            logger.info(f"Computing local dates in {self.time_zone} for {self.path}")
+            conn.execute(f"UPDATE {SQLITE_TABLE} SET local_date = local_date(date)")
+            # Totals recorded before the column existed (or in another time zone) are unreliable; db.py rebuilds them
+            conn.execute(f"DELETE FROM {SQLITE_TOTALS_TABLE}")
+            conn.execute(f"INSERT OR REPLACE INTO {SQLITE_META_TABLE} (key, value) VALUES ('time_zone', ?)", [self.time_zone])
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so read-then-write methods are atomic
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit; writes open their own transactions in _transaction()
+            conn = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            # WAL lets readers run alongside the single writer; NORMAL sync is durable across crashes in WAL mode
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.create_function("date_to_string", 3, _date_to_string_sql, deterministic=True)
+            conn.create_function("local_date", 1, lambda value: _local_date(value, self.time_zone), deterministic=True)
+            self._local.conn = conn
+            logger.debug(f"Opened SQLite connection to {self.path}")
+        return conn
+
+    def _select(self, where='1', params=(), sort=None, limit=0):
+        sql = f"{_SELECT} WHERE {where}"
+        if sort:
+            sql += f" ORDER BY {_order_by(sort)}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [_to_doc(row) for row in self._connection().execute(sql, params)]
+
+    def _first(self, conn, query):
+        where, params = _where(query)
+        row = conn.execute(f"{_SELECT} WHERE {where} LIMIT 1", params).fetchone()
+        return _to_doc(row) if row is not None else None
+
+    def _insert(self, conn, data):
+        unknown = set(data) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unsupported field: {', '.join(sorted(unknown))}")
+        values = [_to_sql(field, data.get(field)) for field in FIELDS]
+        values.append(_local_date(_to_sql('date', data.get('date')), self.time_zone))
+        cursor = conn.execute(f"INSERT INTO {SQLITE_TABLE} ({', '.join(FIELDS)}, local_date) VALUES (?, ?, ?, ?, ?)", values)
+        data['_id'] = str(cursor.lastrowid)
+        return data['_id']
+
+    def _adjust_totals(self, conn, sign, where, params):
+        # Adds (sign=1) or takes away (sign=-1) the matching rows in the caller's transaction, so the
+        # running totals commit or roll back together with the expense write
+        for kind, key in TOTALS_KEYS.items():
+            conn.execute(
+                f"INSERT INTO {SQLITE_TOTALS_TABLE} (kind, key, total, count) "
+                f"SELECT ?, {key}, {sign} * TOTAL(amount), {sign} * COUNT(*) FROM {SQLITE_TABLE} "
+                f"WHERE ({where}) AND {key} IS NOT NULL GROUP BY {key} "
+                "ON CONFLICT (kind, key) DO UPDATE SET total = total + excluded.total, count = count + excluded.count",
+                [kind] + list(params))
+        if sign < 0:
+            conn.execute(f"DELETE FROM {SQLITE_TOTALS_TABLE} WHERE count <= 0 AND kind != ?", [OVERALL])
+
+    def _set(self, conn, doc, update_data):
+        unsupported = set(update_data) - {'$set'}
+        if unsupported:
+            raise ValueError(f"Unsupported update operator: {', '.join(sorted(unsupported))}")
+        changes = {field: value for field, value in update_data.get('$set', {}).items() if field != '_id'}
+        if not changes:
+            return False
+        assignments = ', '.join(f"{_column(field)} = ?" for field in changes)
+        values = [_to_sql(field, value) for field, value in changes.items()]
+        if 'date' in changes:
+            assignments += ", local_date = ?"
+            values.append(_local_date(_to_sql('date', changes['date']), self.time_zone))
+        counted = {'amount', 'category', 'date'} & set(changes)
+        if counted:
+            self._adjust_totals(conn, -1, "id = ?", [int(doc['_id'])])
+        conn.execute(f"UPDATE {SQLITE_TABLE} SET {assignments} WHERE id = ?", values + [int(doc['_id'])])
+        if counted:
+            self._adjust_totals(conn, 1, "id = ?", [int(doc['_id'])])
+        return any(doc.get(field, object()) != value for field, value in changes.items())
+
+    def _delete(self, conn, where, params):
+        self._adjust_totals(conn, -1, where, params)
+        return conn.execute(f"DELETE FROM {SQLITE_TABLE} WHERE {where}", params).rowcount
+
+    # --- Aggregation ---
+    def _group(self, where, params, spec):
+        key_sql, key_convert, key_params = _group_key(spec['_id'], self.time_zone)
+        fields = [field for field in spec if field != '_id']
+        accumulators = [_accumulator(spec[field]) for field in fields]
+        columns = ', '.join([f"{key_sql} AS group_key"] + [sql for sql, _ in accumulators])
+        sql = f"SELECT {columns} FROM {SQLITE_TABLE} WHERE {where} GROUP BY group_key"
+        results = []
+        for row in self._connection().execute(sql, key_params + list(params)):
+            doc = {'_id': key_convert(row[0])}
+            for field, (_, convert), value in zip(fields, accumulators, row[1:]):
+                doc[field] = convert(value)
+            results.append(doc)
+        return results
+
+    def _aggregate(self, where, params, pipeline):
+        stages = list(pipeline)
+        # Leading $match stages become the WHERE clause
+        while stages and '$match' in stages[0]:
+            sql, sql_params = _where(stages.pop(0)['$match'])
+            where, params = f"({where}) AND ({sql})", list(params) + sql_params
+        if not stages:
+            return self._select(where, params)
+        (name, spec), = stages[0].items()
+        if name == '$facet':
+            facets = {field: self._aggregate(where, params, sub_pipeline) for field, sub_pipeline in spec.items()}
+            return _run_pipeline([facets], stages[1:])
+        if name == '$group':
+            try:
+                return _run_pipeline(self._group(where, params, spec), stages[1:])
+            except _Unsupported:
+                pass
+        # $sort / $limit directly on documents are pushed into the SELECT
+        sort, limit = None, 0
+        if stages and '$sort' in stages[0] and all(field in COLUMNS for field in stages[0]['$sort']):
+            sort = list(stages.pop(0)['$sort'].items())
+        if sort is not None and stages and '$limit' in stages[0]:
+            limit = stages.pop(0)['$limit']
+        return _run_pipeline(self._select(where, params, sort, limit), stages)
+
+    # --- Collection API ---
+    def insert_one(self, data):
+        with self._transaction() as conn:
+            inserted_id = self._insert(conn, data)
+            self._adjust_totals(conn, 1, "id = ?", [int(inserted_id)])
+        return type('obj', (object,), {'inserted_id': inserted_id})
+
+    def insert_many(self, documents, ordered=True):
+        # One transaction for the whole batch instead of a commit per row
+        with self._transaction() as conn:
+            inserted_ids = [self._insert(conn, data) for data in documents]
+            if inserted_ids:
+                # Ids only grow, and the write lock is held, so the batch is exactly the rows from its first id on
+                self._adjust_totals(conn, 1, "id >= ?", [int(inserted_ids[0])])
+        return type('obj', (object,), {'inserted_ids': inserted_ids})
+
+    def find(self, query=None, projection=None, sort=None, limit=0):
+        where, params = _where(query)
+        return [_project(doc, projection) for doc in self._select(where, params, sort, limit)]
+
+    def find_one(self, query=None, projection=None):
+        doc = self._first(self._connection(), query)
+        return _project(doc, projection) if doc is not None else None
+
+    def aggregate(self, pipeline):
+        return self._aggregate('1', [], pipeline)
+
+    def delete_many(self, query=None):
+        where, params = _where(query)
+        with self._transaction() as conn:
+            deleted_count = self._delete(conn, where, params)
+        return type('obj', (object,), {'deleted_count': deleted_count})
+
+    def delete_one(self, query):
+        with self._transaction() as conn:
+            doc = self._first(conn, query)
+            deleted_count = self._delete(conn, "id = ?", [int(doc['_id'])]) if doc is not None else 0
+        return type('obj', (object,), {'deleted_count': deleted_count})
+
+    def update_one(self, query, update_data):
+        with self._transaction() as conn:
+            doc = self._first(conn, query)
+            if doc is None:
+                return type('obj', (object,), {'matched_count': 0, 'modified_count': 0})
+            modified = self._set(conn, doc, update_data)
+        return type('obj', (object,), {'matched_count': 1, 'modified_count': int(modified)})
+
+    def find_one_and_update(self, query, update_data, return_document=False):
+        # return_document mirrors pymongo.ReturnDocument: False = BEFORE, True = AFTER
+        with self._transaction() as conn:
+            doc = self._first(conn, query)
+            if doc is None:
+                return None
+            self._set(conn, doc, update_data)
+            return self._first(conn, {'_id': doc['_id']}) if return_document else doc
+
+    def find_one_and_delete(self, query):
+        with self._transaction() as conn:
+            doc = self._first(conn, query)
+            if doc is not None:
+                self._delete(conn, "id = ?", [int(doc['_id'])])
+        return doc
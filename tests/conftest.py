@@ -0,0 +1,12 @@
+# conftest.py
+
+import os
+import sys
+
+# The modules live at the repository root; the tests never need a MongoDB server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("EXPENSE_TRACKER_STORAGE", "memory")
+
+from settings_config import configure_django
+
+configure_django()
@@ -0,0 +1,29 @@
+# test_add_expense_csrf.py
+
+import asyncio
+import json
+from django.test import AsyncClient, Client, override_settings
+from django.urls import path
+import backend
+from write_behind import InsertBatcher
+
+# add_expense_async is only routed in production with MongoDB and WRITE_BEHIND_INSERTS=1
+urlpatterns = [path('api/expenses/add/', backend.add_expense_async, name='add_expense')]
+
+EXPENSE = {"product_name": "Coffee", "amount": 3.5, "category": "Food"}
+
+def test_add_expense_without_csrf_token():
+    response = Client(enforce_csrf_checks=True).post('/api/expenses/add/', EXPENSE, content_type='application/json')
+    assert response.status_code == 201
+
+@override_settings(ROOT_URLCONF=__name__)
+def test_async_add_expense_without_csrf_token(monkeypatch):
+    batcher = InsertBatcher(backend.collection)
+    monkeypatch.setattr(backend, 'insert_batcher', batcher)
+    try:
+        response = asyncio.run(AsyncClient(enforce_csrf_checks=True).post(
+            '/api/expenses/add/', json.dumps(EXPENSE), content_type='application/json'))
+    finally:
+        batcher.close()
+    assert response.status_code == 201
+    assert response.json()["product_name"] == "Coffee"
@@ -0,0 +1,119 @@
+# test_durable_memory.py
+
+import os
+from datetime import datetime, timezone as dt_timezone
+import pytest
+import backend
+import db
+from durable_memory import DurableInMemoryDB
+from write_behind import InsertBatcher
+
+DATE = datetime(2024, 3, 1, 12, tzinfo=dt_timezone.utc)
+
+def _expense(index):
+    return {"product_name": f"Item {index}", "amount": float(index), "category": "Food", "date": DATE}
+
+def test_shutdown_flushes_the_batcher_before_closing_the_log(tmp_path, monkeypatch):
+    store = DurableInMemoryDB(str(tmp_path))
+    # A long delay keeps the expenses buffered until shutdown
+    batcher = InsertBatcher(store, max_delay_ms=60000)
+    monkeypatch.setattr(backend, 'insert_batcher', batcher)
+    monkeypatch.setattr(db, 'durable_collection', store)
+    futures = [batcher.submit(_expense(index)) for index in range(3)]
+    backend._shutdown()
+    assert [future.result(timeout=0) for future in futures] == ['1', '2', '3']
+    assert len(DurableInMemoryDB(str(tmp_path)).expenses) == 3
+
+def test_closed_store_refuses_writes_without_applying_them(tmp_path):
+    store = DurableInMemoryDB(str(tmp_path))
+    store.insert_one(_expense(1))
+    store.close()
+    with pytest.raises(RuntimeError):
+        store.insert_one(_expense(2))
+    with pytest.raises(RuntimeError):
+        store.update_one({"_id": "1"}, {"$set": {"amount": 5.0}})
+    with pytest.raises(RuntimeError):
+        store.delete_many({})
+    assert list(store.expenses) == ['1']
+    assert store.expenses['1']['amount'] == 1.0
+    assert store.counter == 1
+
+def _reopen(store, **options):
+    store.close()
+    return DurableInMemoryDB(store.data_dir, **options)
+
+def _write_history(store):
+    store.insert_many([_expense(index) for index in range(1, 6)])
+    store.insert_one(_expense(6))
+    store.update_one({"_id": "2"}, {"$set": {"amount": 20.0, "date": datetime(2024, 4, 1, tzinfo=dt_timezone.utc)}})
+    store.find_one_and_update({"_id": "3"}, {"$set": {"category": "Rent"}})
+    store.delete_one({"_id": "4"})
+    store.find_one_and_delete({"_id": "6"})
+
+def test_log_replay_restores_expenses_and_counter(tmp_path):
+    store = DurableInMemoryDB(str(tmp_path))
+    _write_history(store)
+    expected = {_id: dict(doc) for _id, doc in store.expenses.items()}
+    recovered = _reopen(store)
+    assert recovered.expenses == expected
+    # The highest id was deleted; ids still never repeat
+    assert recovered.counter == 6
+    assert recovered.insert_one(_expense(7)).inserted_id == '7'
+    assert [doc["_id"] for doc in recovered.find({}, sort=[('date', 1), ('_id', 1)])] == ['1', '3', '5', '7', '2']
+
+def test_clear_record_is_replayed(tmp_path):
+    store = DurableInMemoryDB(str(tmp_path))
+    _write_history(store)
+    store.delete_many({})
+    store.insert_one(_expense(7))
+    recovered = _reopen(store)
+    assert list(recovered.expenses) == ['7']
+    assert recovered.counter == 7
+
+def test_snapshot_rotates_log_generations(tmp_path):
+    store = DurableInMemoryDB(str(tmp_path))
+    _write_history(store)
+    store.snapshot()
+    store.update_one({"_id": "1"}, {"$set": {"amount": 11.0}})
+    store.insert_one(_expense(7))
+    assert store.generation == 1
+    assert store._log_generations() == [1]
+    expected = {_id: dict(doc) for _id, doc in store.expenses.items()}
+    recovered = _reopen(store)
+    assert recovered.expenses == expected
+    assert recovered.counter == 7
+    assert recovered.find_one({"_id": "1"})["amount"] == 11.0
+
+def test_long_replay_writes_a_snapshot_on_open(tmp_path):
+    store = DurableInMemoryDB(str(tmp_path))
+    _write_history(store)
+    expected = {_id: dict(doc) for _id, doc in store.expenses.items()}
+    recovered = _reopen(store, snapshot_every=5)
+    assert recovered.generation == 1
+    assert (tmp_path / "snapshot.jsonl").exists()
+    assert _reopen(recovered).expenses == expected
+
+def test_torn_last_record_is_discarded(tmp_path):
+    store = DurableInMemoryDB(str(tmp_path))
+    _write_history(store)
+    expected = {_id: dict(doc) for _id, doc in store.expenses.items()}
+    store.close()
+    log_path = store._log_path(store.generation)
+    size = os.path.getsize(log_path)
+    with open(log_path, "ab") as f:
+        f.write(b'{"op":"insert","doc":{"product_na')
+    recovered = DurableInMemoryDB(str(tmp_path))
+    assert recovered.expenses == expected
+    assert os.path.getsize(log_path) == size
+    # Appends after the cut start on a clean line
+    recovered.insert_one(_expense(7))
+    assert _reopen(recovered).find_one({"_id": "7"})["product_name"] == "Item 7"
+
+def test_torn_record_before_the_end_is_an_error(tmp_path):
+    store = DurableInMemoryDB(str(tmp_path))
+    store.insert_one(_expense(1))
+    store.close()
+    with open(store._log_path(store.generation), "ab") as f:
+        f.write(b'{"op":"insert"\n{"op":"clear"}\n')
+    with pytest.raises(ValueError):
+        DurableInMemoryDB(str(tmp_path))
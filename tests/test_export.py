@@ -0,0 +1,51 @@
+# test_export.py
+
+import json
+from datetime import datetime, timezone as dt_timezone
+from bson import ObjectId
+from django.test import Client
+import backend
+from db import _matches
+
+# Date-only CSV imports give many expenses the same timestamp, so keyset batches split on _id ties
+DATE = datetime(2024, 3, 1, tzinfo=dt_timezone.utc)
+
+class _ObjectIdCollection:
+    # Stands in for MongoDB: ObjectId ids, and values of different BSON types never compare as matching
+    def __init__(self, count):
+        self.documents = [{"_id": ObjectId(), "product_name": f"Item {index}", "amount": 1.0, "category": "Food", "date": DATE}
+                          for index in range(count)]
+        self.queries = []
+
+    def find(self, query=None, projection=None, sort=None, limit=0):
+        self.queries.append(query)
+        rows = sorted((doc for doc in self.documents if self._matches(doc, query)), key=lambda doc: (doc["date"], doc["_id"]))
+        return [dict(doc) for doc in rows[:limit or None]]
+
+    def _matches(self, doc, query):
+        try:
+            return _matches(doc, query)
+        except TypeError:
+            return False
+
+def _export(monkeypatch, fmt):
+    collection = _ObjectIdCollection(8)
+    monkeypatch.setattr(backend, 'collection', collection)
+    monkeypatch.setattr(backend, 'EXPORT_BATCH_SIZE', 3)
+    response = Client().get('/api/expenses/export/', {"format": fmt})
+    assert response.status_code == 200
+    return collection, b''.join(response.streaming_content).decode()
+
+def test_ndjson_export_crosses_batches_on_a_shared_date(monkeypatch):
+    collection, body = _export(monkeypatch, 'ndjson')
+    exported = [json.loads(line) for line in body.splitlines()]
+    assert [row["_id"] for row in exported] == sorted(str(doc["_id"]) for doc in collection.documents)
+    assert len(collection.queries) == 3
+    for query in collection.queries[1:]:
+        assert isinstance(query['$or'][1]['_id']['$gt'], ObjectId)
+
+def test_csv_export_crosses_batches_on_a_shared_date(monkeypatch):
+    collection, body = _export(monkeypatch, 'csv')
+    lines = body.splitlines()
+    assert lines[0] == ','.join(backend.EXPORT_FIELDS)
+    assert [line.split(',')[0] for line in lines[1:]] == sorted(str(doc["_id"]) for doc in collection.documents)
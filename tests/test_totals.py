@@ -0,0 +1,65 @@
+# test_totals.py
+
+import pytest
+from django.test import Client
+import db
+from sqlite_db import SQLiteDB
+from totals import InMemoryTotals, SQLiteTotals
+
+# The write views keep the running totals in step; every step is checked against a full recomputation
+@pytest.fixture(params=['memory', 'sqlite'])
+def storage(request, tmp_path, monkeypatch):
+    if request.param == 'memory':
+        collection, totals = db.InMemoryDB(), InMemoryTotals()
+    else:
+        collection = SQLiteDB(str(tmp_path / "expenses.db"))
+        totals = SQLiteTotals(collection)
+    storage = {'engine': request.param, 'collection': collection, 'totals': totals, 'meta_collection': None}
+    monkeypatch.setattr(db, '_storage', storage)
+    return storage
+
+def _add(client, storage, product_name, amount, category, date):
+    response = client.post('/api/expenses/add/', {"product_name": product_name, "amount": amount, "category": category, "date": date},
+                           content_type='application/json')
+    assert response.status_code == 201
+    return storage['collection'].find_one({"product_name": product_name})["_id"]
+
+def _assert_consistent(client, storage, total):
+    assert storage['totals'].verify(storage['collection']) == []
+    assert client.get('/api/expenses/total/').json()["total"] == pytest.approx(total)
+
+def test_write_views_keep_totals_consistent(storage):
+    client = Client()
+    coffee = _add(client, storage, "Coffee", 3.5, "Food", "2024-01-31T23:30:00Z")
+    rent = _add(client, storage, "Rent", 900.0, "Housing", "2024-02-01T09:00:00Z")
+    book = _add(client, storage, "Book", 20.0, "Books", "2024-02-15T12:00:00Z")
+    _assert_consistent(client, storage, 923.5)
+
+    # Moves the expense to another month and category
+    response = client.put(f'/api/expenses/{coffee}/update/', {"amount": 4.0, "category": "Drinks", "date": "2024-03-02T08:00:00Z"},
+                          content_type='application/json')
+    assert response.status_code == 200
+    _assert_consistent(client, storage, 924.0)
+
+    response = client.post('/api/expenses/batch/update/', {"updates": [
+        {"_id": rent, "amount": 950.0, "date": "2024-01-01T09:00:00Z"},
+        {"_id": book, "category": "Gifts"},
+    ]}, content_type='application/json')
+    assert response.json() == {"updated": 2, "errors": []}
+    _assert_consistent(client, storage, 974.0)
+    assert set(storage['totals'].by('category')) == {"Drinks", "Housing", "Gifts"}
+
+    response = client.post('/api/expenses/batch/delete/', {"ids": [rent, book]}, content_type='application/json')
+    assert response.json() == {"deleted": 2}
+    _assert_consistent(client, storage, 4.0)
+    assert list(storage['totals'].by('month')) == ["2024-03"]
+
+    response = client.delete(f'/api/expenses/{coffee}/delete/')
+    assert response.status_code == 200
+    _assert_consistent(client, storage, 0.0)
+
+    _add(client, storage, "Lunch", 12.0, "Food", "2024-03-05T12:00:00Z")
+    response = client.delete('/api/expenses/reset/')
+    assert response.status_code == 200
+    _assert_consistent(client, storage, 0.0)
+    assert storage['totals'].get() == {"total": 0.0, "count": 0}
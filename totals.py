@@ -0,0 +1,257 @@
+# totals.py
+
+import sys
+import math
+import logging
+import threading
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+# Kinds of running totals kept alongside the expenses
+OVERALL = "all"
+MONTH = "month"
+CATEGORY = "category"
+
+def _time_zone():
+    from django.conf import settings
+    return settings.TIME_ZONE
+
+def month_key(date):
+    # Same bucketing as the month summary pipeline: calendar month in settings.TIME_ZONE
+    if not isinstance(date, datetime):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.astimezone(ZoneInfo(_time_zone())).strftime("%Y-%m")
+
+def _deltas(expenses, sign):
+    deltas = {}
+    for expense in expenses:
+        amount = expense.get('amount') or 0
+        keys = [(OVERALL, None), (MONTH, month_key(expense.get('date'))), (CATEGORY, expense.get('category'))]
+        for kind, key in keys:
+            if kind != OVERALL and key is None:
+                continue
+            delta = deltas.setdefault((kind, key), [0.0, 0])
+            delta[0] += sign * amount
+            delta[1] += sign
+    return deltas
+
+def _recompute(collection):
+    def grouped(group_id):
+        pipeline = [{'$group': {'_id': group_id, 'total': {'$sum': '$amount'}, 'count': {'$sum': 1}}}]
+        return list(collection.aggregate(pipeline))
+
+    computed = {(OVERALL, None): [0.0, 0]}
+    for row in grouped(None):
+        computed[(OVERALL, None)] = [row['total'], row['count']]
+    month_id = {'$dateToString': {'format': '%Y-%m', 'date': '$date', 'timezone': _time_zone()}}
+    for kind, group_id in ((MONTH, month_id), (CATEGORY, '$category')):
+        for row in grouped(group_id):
+            if row['_id'] is not None:
+                computed[(kind, row['_id'])] = [row['total'], row['count']]
+    return computed
+
+# --- Running Totals ---
+class RunningTotals:
+    def add(self, *expenses):
+        self._apply(_deltas(expenses, 1))
+
+    def remove(self, *expenses):
+        self._apply(_deltas(expenses, -1))
+
+    def get(self):
+        total, count = self._snapshot().get((OVERALL, None), (0.0, 0))
+        return {"total": total, "count": count}
+
+    def by(self, kind):
+        rows = {key: {"total": total, "count": count} for (row_kind, key), (total, count) in self._snapshot().items() if row_kind == kind and count > 0}
+        return dict(sorted(rows.items()))
+
+    def verify(self, collection):
+        # Returns a list of entries whose stored totals disagree with a full recomputation
+        computed = _recompute(collection)
+        stored = {key: value for key, value in self._snapshot().items() if key[0] == OVERALL or value[1] > 0}
+        drift = []
+        for kind, key in sorted(set(computed) | set(stored), key=str):
+            expected = computed.get((kind, key), [0.0, 0])
+            actual = stored.get((kind, key), [0.0, 0])
+            if expected[1] != actual[1] or not math.isclose(expected[0], actual[0], abs_tol=0.005):
+                drift.append({"kind": kind, "key": key, "expected": expected, "actual": actual})
+        return drift
+
+    def rebuild(self, collection):
+        self._replace(_recompute(collection))
+
+class InMemoryTotals(RunningTotals):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}
+
+    def _apply(self, deltas):
+        with self._lock:
+            for kind_key, (amount, count) in deltas.items():
+                row = self._rows.setdefault(kind_key, [0.0, 0])
+                row[0] += amount
+                row[1] += count
+                if row[1] <= 0 and kind_key[0] != OVERALL:
+                    del self._rows[kind_key]
+
+    def _snapshot(self):
+        with self._lock:
+            return {kind_key: list(row) for kind_key, row in self._rows.items()}
+
+    def _replace(self, rows):
+        with self._lock:
+            self._rows = {kind_key: list(row) for kind_key, row in rows.items()}
+
+    def reset(self):
+        self._replace({})
+
+class SQLiteTotals(RunningTotals):
+    # The expense_totals table in the SQLite file, which SQLiteDB updates in each expense write's transaction
+    def __init__(self, database):
+        # `database` is the SQLiteDB holding the expenses; its connections and transactions are reused
+        from sqlite_db import SQLITE_TOTALS_TABLE
+        self.database = database
+        self.table = SQLITE_TOTALS_TABLE
+
+    # The overall row has no key; '' stands in for it because NULLs are never equal in a primary key
+    @staticmethod
+    def _to_row(kind, key):
+        return kind, '' if key is None else key
+
+    @staticmethod
+    def _from_row(kind, key):
+        return kind, None if kind == OVERALL else key
+
+    def seeded(self):
+        return self.database._connection().execute(f"SELECT 1 FROM {self.table} WHERE kind = ?", [OVERALL]).fetchone() is not None
+
+    # SQLiteDB already applied these changes together with the expense write
+    def add(self, *expenses):
+        pass
+
+    def remove(self, *expenses):
+        pass
+
+    def _snapshot(self):
+        rows = self.database._connection().execute(f"SELECT kind, key, total, count FROM {self.table}")
+        return {self._from_row(kind, key): [total, count] for kind, key, total, count in rows}
+
+    def _replace(self, rows):
+        # One transaction, so readers see either the old or the new totals
+        with self.database._transaction() as conn:
+            conn.execute(f"DELETE FROM {self.table}")
+            conn.executemany(f"INSERT INTO {self.table} (kind, key, total, count) VALUES (?, ?, ?, ?)",
+                             [[*self._to_row(kind, key), total, count] for (kind, key), (total, count) in rows.items()])
+
+    def reset(self):
+        # The expenses are already gone; this only clears rounding left in the overall total
+        self._replace({(OVERALL, None): [0.0, 0]})
+
+class MongoTotals(RunningTotals):
+    # One document per running total, e.g. {_id: "month:2025-01", kind, key, total, count}
+    def __init__(self, collection, expenses):
+        self.collection = collection
+        self.expenses = expenses
+        self._seeded = False
+
+    def ensure_seeded(self):
+        # Deployments that predate running totals have expenses but no totals documents yet.
+        # Creating the overall document is the claim: of several workers starting together, only
+        # the one whose upsert inserted it seeds.
+        if not self._seeded:
+            existing = self.collection.find_one_and_update(
+                {'_id': OVERALL},
+                {'$setOnInsert': {'kind': OVERALL, 'key': None, 'total': 0.0, 'count': 0}},
+                upsert=True,
+            )
+            if existing is None and self.expenses.find_one({}) is not None:
+                logger.info("Seeding running totals from the expenses collection")
+                self.rebuild(self.expenses)
+            self._seeded = True
+
+    @staticmethod
+    def _doc_id(kind, key):
+        return kind if kind == OVERALL else f"{kind}:{key}"
+
+    def _apply(self, deltas):
+        from pymongo import UpdateOne
+        self.ensure_seeded()
+        operations = [
+            UpdateOne(
+                {'_id': self._doc_id(kind, key)},
+                {'$inc': {'total': amount, 'count': count}, '$setOnInsert': {'kind': kind, 'key': key}},
+                upsert=True,
+            )
+            for (kind, key), (amount, count) in deltas.items()
+        ]
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+    def _snapshot(self):
+        return {(doc['kind'], doc['key']): [doc['total'], doc['count']] for doc in self.collection.find({})}
+
+    def _replace(self, rows):
+        # Written to a side collection that then atomically takes the place of the live one, so
+        # concurrent $inc upserts never meet a half-emptied collection
+        staging = self.collection.database[f"{self.collection.name}_rebuild"]
+        staging.drop()
+        for name, spec in self.collection.index_information().items():
+            if name != '_id_':
+                staging.create_index(spec['key'], name=name, unique=spec.get('unique', False))
+        staging.insert_many([
+            {'_id': self._doc_id(kind, key), 'kind': kind, 'key': key, 'total': total, 'count': count}
+            for (kind, key), (total, count) in rows.items()
+        ])
+        staging.rename(self.collection.name, dropTarget=True)
+
+    def get(self):
+        self.ensure_seeded()
+        doc = self.collection.find_one({'_id': OVERALL})
+        return {"total": doc['total'], "count": doc['count']} if doc else {"total": 0.0, "count": 0}
+
+    def by(self, kind):
+        self.ensure_seeded()
+        docs = self.collection.find({'kind': kind, 'count': {'$gt': 0}}, sort=[('key', 1)])
+        return {doc['key']: {"total": doc['total'], "count": doc['count']} for doc in docs}
+
+    def reset(self):
+        self.collection.delete_many({})
+        self._seeded = True
+
+    # --- Async reads, given the same collection opened through pymongo's AsyncMongoClient ---
+    async def aget(self, async_collection):
+        doc = await async_collection.find_one({'_id': OVERALL})
+        return {"total": doc['total'], "count": doc['count']} if doc else {"total": 0.0, "count": 0}
+
+    async def aby(self, kind, async_collection):
+        docs = await async_collection.find({'kind': kind, 'count': {'$gt': 0}}, sort=[('key', 1)]).to_list()
+        return {doc['key']: {"total": doc['total'], "count": doc['count']} for doc in docs}
+
+# --- Rebuild / Verify Command ---
+def main(argv):
+    from settings_config import configure_django
+    configure_django()
+    from db import collection, totals
+
+    command = argv[1] if len(argv) > 1 else "verify"
+    if command not in ("verify", "rebuild"):
+        print("Usage: python totals.py [verify|rebuild]")
+        return 2
+    drift = totals.verify(collection)
+    for entry in drift:
+        print(f"{entry['kind']} {entry['key']}: stored {entry['actual']} != recomputed {entry['expected']}")
+    if command == "rebuild":
+        totals.rebuild(collection)
+        print(f"Rebuilt running totals ({len(drift)} entries were out of date)")
+        return 0
+    print("Running totals are consistent" if not drift else f"{len(drift)} running totals have drifted")
+    return 1 if drift else 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main(sys.argv))
@@ -0,0 +1,111 @@
+# write_behind.py
+
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from metrics import registry, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Opt-in group commit for POST /api/expenses/add/
+WRITE_BEHIND = os.environ.get("WRITE_BEHIND_INSERTS") == "1"
+# A batch is written once it holds this many expenses...
+WRITE_BEHIND_MAX_BATCH = int(os.environ.get("WRITE_BEHIND_MAX_BATCH", "500"))
+# ...or once its oldest expense has waited this long
+WRITE_BEHIND_MAX_DELAY_MS = float(os.environ.get("WRITE_BEHIND_MAX_DELAY_MS", "5"))
+# Expenses waiting to be written; when full, new requests wait up to the timeout and are then rejected
+WRITE_BEHIND_CAPACITY = int(os.environ.get("WRITE_BEHIND_CAPACITY", "5000"))
+WRITE_BEHIND_ENQUEUE_TIMEOUT = 1.0  # seconds
+WRITE_BEHIND_CLOSE_TIMEOUT = 30.0  # seconds
+
+batch_sizes = registry.register(Histogram(
+    "expense_tracker_write_behind_batch_size", "Expenses written per write-behind insert_many",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)))
+
+_STOP = object()
+
+class BufferFull(Exception):
+    # Backpressure: the write buffer stayed full for the whole enqueue timeout
+    pass
+
+# --- Group Commit ---
+class InsertBatcher:
+    def __init__(self, collection, max_batch=WRITE_BEHIND_MAX_BATCH, max_delay_ms=WRITE_BEHIND_MAX_DELAY_MS, capacity=WRITE_BEHIND_CAPACITY):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._queue = queue.Queue(maxsize=capacity)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="insert-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, document, timeout=WRITE_BEHIND_ENQUEUE_TIMEOUT):
+        # Returns a Future resolved with the inserted id, or with the write error for this document
+        if self._closed:
+            raise RuntimeError("The insert batcher has been closed")
+        future = Future()
+        try:
+            if timeout:
+                self._queue.put((document, future), timeout=timeout)
+            else:
+                self._queue.put_nowait((document, future))
+        except queue.Full:
+            raise BufferFull(f"{self._queue.maxsize} expenses are already waiting to be written")
+        return future
+
+    def insert(self, document, timeout=WRITE_BEHIND_ENQUEUE_TIMEOUT):
+        return self.submit(document, timeout).result()
+
+    def close(self, timeout=WRITE_BEHIND_CLOSE_TIMEOUT):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        from pymongo.errors import BulkWriteError
+        documents = [document for document, _ in batch]
+        batch_sizes.observe(len(batch))
+        try:
+            self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed = {error['index']: error for error in e.details.get('writeErrors', [])}
+            for index, (document, future) in enumerate(batch):
+                if index in failed:
+                    future.set_exception(RuntimeError(failed[index]['errmsg']))
+                else:
+                    future.set_result(document['_id'])
+            return
+        except Exception as e:
+            logger.error(f"Write-behind insert of {len(batch)} expenses failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for document, future in batch:
+            future.set_result(document['_id'])